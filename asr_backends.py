@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Selectable speech recognition backends for Ada.
+
+Every backend takes 16 kHz mono float32 audio and returns text, so the apps
+can switch engines through configuration:
+
+    {"backend": "whisper", "model": "base"}                      # PyTorch Whisper (fp32 on CPU)
+    {"backend": "faster-whisper", "model": "small",
+     "compute_type": "int8", "cpu_threads": 0}                   # CTranslate2, int8 weights
+
+The int8 engine is the one to use on machines without a GPU: quantized
+weights and a tuned intra-op thread count make a larger model run at the
+latency of a smaller fp32 one. Run benchmarks/asr_rtf.py to compare the
+real-time factor of configurations on the same WAV files.
+"""
+import os
+import wave
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+BATCH_SECONDS = 30  # Whisper's input window; longer clips are transcribed on their own
+
+DEFAULT_ASR_CONFIG = {
+    "backend": "faster-whisper",
+    "model": "base",
+    "device": "cpu",
+    "compute_type": "int8",
+    "cpu_threads": 0,   # 0 = one thread per physical core
+    "beam_size": 1,     # Greedy decoding; raise for accuracy at the cost of latency
+    "num_workers": 1,   # Transcriptions faster-whisper can run at once (the voice server shares one model)
+    "language": "en",
+}
+
+
+def default_cpu_threads():
+    """One intra-op thread per physical core (assumes 2-way SMT), which beats oversubscribing"""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class ASRBackend:
+    """Interface every speech recognition engine implements"""
+
+    name = "base"
+
+    def __init__(self, config):
+        self.config = dict(DEFAULT_ASR_CONFIG, **config)
+        self.model = None
+
+    def key(self):
+        """Identifies the loaded weights, for the process-wide model registry"""
+        c = self.config
+        return ("asr", self.name, c["model"], c["device"], c["compute_type"], c["cpu_threads"])
+
+    def load(self):
+        """Load the weights (slow; call from a background thread). Returns self"""
+        raise NotImplementedError
+
+    def transcribe(self, audio, prompt=None):
+        """Transcribe float32 16 kHz mono audio; prompt is optional preceding text for context"""
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios, prompts=None):
+        """Transcribe several clips at once (see asr_scheduler); engines without batching go one by one"""
+        prompts = prompts or [None] * len(audios)
+        return [self.transcribe(audio, prompt) for audio, prompt in zip(audios, prompts)]
+
+    def describe(self):
+        c = self.config
+        return f"{self.name}:{c['model']} ({c['device']}, {c['compute_type']}, {self.threads()} threads)"
+
+    def threads(self):
+        return self.config["cpu_threads"] or default_cpu_threads()
+
+
+class WhisperBackend(ASRBackend):
+    """Stock PyTorch openai-whisper"""
+
+    name = "whisper"
+
+    def load(self):
+        import torch
+        import whisper  # Deferred: pulls in torch
+        if self.config["device"] == "cpu":
+            torch.set_num_threads(self.threads())
+        self.model = whisper.load_model(self.config["model"], device=self.config["device"])
+        return self
+
+    def transcribe(self, audio, prompt=None):
+        result = self.model.transcribe(
+            audio,
+            initial_prompt=prompt or None,
+            language=self.config["language"],
+            beam_size=self.config["beam_size"] if self.config["beam_size"] > 1 else None,
+            fp16=self.config["device"] == "cuda",
+        )
+        return result["text"].strip()
+
+    def transcribe_batch(self, audios, prompts=None):
+        """Pad every clip to Whisper's 30 s window and decode them together in one call"""
+        prompts = prompts or [None] * len(audios)
+        if len(audios) == 1 or any(prompts) or any(len(audio) > BATCH_SECONDS * SAMPLE_RATE for audio in audios):
+            return super().transcribe_batch(audios, prompts)  # decode() takes one prompt for the whole batch
+        import torch
+        import whisper
+        mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)),
+                                                        self.model.dims.n_mels)
+                            for audio in audios]).to(self.model.device)
+        options = whisper.DecodingOptions(language=self.config["language"], without_timestamps=True,
+                                          fp16=self.config["device"] == "cuda")
+        return [result.text.strip() for result in whisper.decode(self.model, mels, options)]
+
+
+class FasterWhisperBackend(ASRBackend):
+    """CTranslate2 Whisper with quantized weights (int8 on CPU)"""
+
+    name = "faster-whisper"
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.config["model"],
+            device=self.config["device"],
+            compute_type=self.config["compute_type"],
+            cpu_threads=self.threads(),
+            num_workers=self.config["num_workers"],
+        )
+        return self
+
+    def transcribe(self, audio, prompt=None):
+        segments, _ = self.model.transcribe(
+            audio,
+            initial_prompt=prompt or None,
+            language=self.config["language"],
+            beam_size=self.config["beam_size"],
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def transcribe_batch(self, audios, prompts=None):
+        """Encode the clips (padded to the 30 s window) as one batch and decode them together"""
+        prompts = prompts or [None] * len(audios)
+        if len(audios) == 1 or any(len(audio) > BATCH_SECONDS * SAMPLE_RATE for audio in audios):
+            return super().transcribe_batch(audios, prompts)
+        from faster_whisper.tokenizer import Tokenizer
+        model = self.model
+        frames = model.feature_extractor.nb_max_frames
+        features = []
+        for audio in audios:
+            mel = model.feature_extractor(audio)[:, :frames]
+            features.append(np.pad(mel, ((0, 0), (0, frames - mel.shape[-1]))))
+
+        tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                              task="transcribe", language=self.config["language"])
+        start = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        decoder_prompts = []
+        for prompt in prompts:
+            if prompt:
+                # Preceding text goes before the start-of-transcript tokens, as faster-whisper does it
+                previous = tokenizer.encode(" " + prompt.strip())[-(model.max_length // 2 - 1):]
+                decoder_prompts.append([tokenizer.sot_prev] + previous + start)
+            else:
+                decoder_prompts.append(start)
+
+        # WhisperModel.encode() takes a batch of features from faster-whisper 1.1 on (see requirements.txt)
+        results = model.model.generate(model.encode(np.stack(features)), decoder_prompts,
+                                       beam_size=self.config["beam_size"], max_length=model.max_length,
+                                       suppress_blank=True, suppress_tokens=[-1])
+        return [tokenizer.decode([token for token in result.sequences_ids[0] if token < tokenizer.eot]).strip()
+                for result in results]
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def create_backend(config):
+    """Build (but don't load) the backend described by config"""
+    config = dict(DEFAULT_ASR_CONFIG, **config)
+    try:
+        backend_class = BACKENDS[config["backend"]]
+    except KeyError:
+        raise ValueError(f"Unknown ASR backend '{config['backend']}' (choose from {', '.join(BACKENDS)})")
+    if backend_class is WhisperBackend and config["compute_type"] == "int8":
+        config["compute_type"] = "float32"  # PyTorch Whisper has no int8 path
+    return backend_class(config)
+
+
+def parse_backend_spec(spec):
+    """Parse 'backend:model[:compute_type[:threads]]', e.g. 'faster-whisper:small:int8:4'"""
+    parts = spec.split(":")
+    config = {"backend": parts[0]}
+    if len(parts) > 1:
+        config["model"] = parts[1]
+    if len(parts) > 2:
+        config["compute_type"] = parts[2]
+    if len(parts) > 3:
+        config["cpu_threads"] = int(parts[3])
+    return config
+
+
+def load_wav(path):
+    """Read a PCM WAV file as 16 kHz mono float32, the format every backend expects"""
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 2:
+        audio = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        audio = np.frombuffer(frames, dtype=np.int32).astype(np.float32) / 2147483648.0
+    elif width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"{path}: unsupported sample width {width}")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        # Linear resampling is plenty for speech recognition input
+        positions = np.arange(0, len(audio), rate / float(SAMPLE_RATE))
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Dynamic batching of transcription requests.
+
+Transcribing utterances one at a time leaves most of the model's throughput
+unused when several are ready at once (several rooms on the voice server,
+recordings queued while the model loaded). The BatchScheduler collects
+ready utterances for a few milliseconds, groups them into length buckets so
+short clips aren't padded up to long ones, and runs each group through the
+backend's transcribe_batch() in one call.
+
+When traffic is light - nothing else arrived within idle_window - a request
+is dispatched at once, so a single user never waits for the batching window.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from asr_backends import SAMPLE_RATE
+
+
+class _Request:
+    def __init__(self, audio, prompt):
+        self.audio = audio
+        self.prompt = prompt
+        self.future = Future()
+        self.arrived = time.monotonic()
+        self.seconds = len(audio) / float(SAMPLE_RATE)
+
+
+class BatchScheduler:
+    """Batches transcribe() calls from many threads onto one ASR backend.
+
+    buckets are upper bounds in seconds of audio; requests only share a batch
+    with others from the same bucket. workers batches can run at once.
+    """
+
+    def __init__(self, backend, max_batch=8, max_wait_ms=30, buckets=(4, 8, 15, 30), idle_window=1.0, workers=1):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0     # Longest a request waits for company
+        self.buckets = tuple(buckets)
+        self.idle_window = idle_window           # No arrival this recent before a request = light traffic
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.last_arrival = 0.0
+        self.closed = False
+
+        # Counters
+        self.requests = 0
+        self.transcribed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.waited = 0.0
+        self.compute_seconds = 0.0
+        self.audio_seconds = 0.0
+
+        self.threads = [threading.Thread(target=self._worker, name=f"ada-asr-batch-{index}", daemon=True)
+                        for index in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, audio, prompt=None):
+        """Queue float32 16 kHz audio; returns a Future resolving to the text"""
+        request = _Request(audio, prompt)
+        with self.cond:
+            # Light traffic: nobody else asked recently, so don't hold this one back
+            request.alone = request.arrived - self.last_arrival > self.idle_window and not self.queue
+            self.last_arrival = request.arrived
+            self.queue.append(request)
+            self.requests += 1
+            self.cond.notify()
+        return request.future
+
+    def transcribe(self, audio, prompt=None, timeout=None):
+        """Blocking submit(), a drop-in for backend.transcribe"""
+        return self.submit(audio, prompt).result(timeout)
+
+    def bucket(self, request):
+        for index, limit in enumerate(self.buckets):
+            if request.seconds <= limit:
+                return index
+        return len(self.buckets)  # Longer than every bucket: transcribed on its own
+
+    def _next_batch(self):
+        """Wait for requests and take the next batch (oldest request first); [] once closed"""
+        with self.cond:
+            while True:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return []
+                oldest = self.queue[0]
+                bucket = self.bucket(oldest)
+                limit = 1 if bucket == len(self.buckets) else self.max_batch
+
+                if not oldest.alone:
+                    deadline = oldest.arrived + self.max_wait
+                    while (sum(1 for r in self.queue if self.bucket(r) == bucket) < limit
+                           and time.monotonic() < deadline and not self.closed):
+                        self.cond.wait(max(0.0, deadline - time.monotonic()))
+
+                taken = [r for r in self.queue if self.bucket(r) == bucket][:limit]
+                for request in taken:
+                    self.queue.remove(request)
+                if self.queue:
+                    self.cond.notify()  # Another worker can take the rest
+                # From here on the callers can't cancel; drop the ones that already did
+                batch = [r for r in taken if r.future.set_running_or_notify_cancel()]
+                self.cancelled += len(taken) - len(batch)
+                if batch:
+                    return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            started = time.monotonic()
+            done = 0
+            try:
+                texts = list(self.backend.transcribe_batch([r.audio for r in batch], [r.prompt for r in batch]))
+                if len(texts) != len(batch):
+                    raise RuntimeError(f"ASR backend returned {len(texts)} transcripts for {len(batch)} utterances")
+                for request, text in zip(batch, texts):
+                    if not request.future.done():
+                        request.future.set_result(text)
+                    done += 1
+            except Exception as e:
+                for request in batch[done:]:  # Nobody waits forever on a request without a result
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            finally:
+                with self.cond:
+                    self.batches += 1
+                    self.transcribed += done
+                    self.failed += len(batch) - done
+                    self.largest_batch = max(self.largest_batch, len(batch))
+                    self.waited += sum(started - r.arrived for r in batch)
+                    self.compute_seconds += time.monotonic() - started
+                    self.audio_seconds += sum(r.seconds for r in batch)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            pending, self.queue = list(self.queue), deque()
+            self.cond.notify_all()
+        for request in pending:
+            if request.future.set_running_or_notify_cancel():
+                request.future.set_exception(RuntimeError("ASR scheduler closed"))
+
+    def summary(self):
+        with self.cond:
+            if not self.batches:
+                return "no transcriptions yet"
+            done = self.transcribed
+            dispatched = done + self.failed
+            rtf = self.compute_seconds / self.audio_seconds if self.audio_seconds else 0.0
+            dropped = f", {self.failed} failed" if self.failed else ""
+            dropped += f", {self.cancelled} cancelled" if self.cancelled else ""
+            return (f"{done} transcriptions{dropped} in {self.batches} batches "
+                    f"(avg {dispatched / float(self.batches):.1f}, max {self.largest_batch}), "
+                    f"avg queue wait {self.waited / dispatched * 1000:.0f} ms, real-time factor {rtf:.3f}")
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Callback-driven PCM output for Ada.
+
+The sink (a PyAudio callback stream, or a clock thread for the null and
+file sinks) asks AudioOutput for the next few milliseconds of audio
+whenever it needs them. AudioOutput answers from a queue of segments - one
+PCMBuffer per chunk of speech, possibly still downloading - so segments
+play back to back with no gap, and nothing ever polls whether the device
+is busy:
+
+    output = AudioOutput()                  # Sound card (PyAudio), or NullSink() / FileSink(path)
+    segment = output.enqueue(buffer)        # Returns at once
+    output.play(other_buffer, on_start)     # Blocks until it has (almost) all been handed to the sink
+    output.wait_finished()                  # Blocks until the last sample has been heard
+    output.stop()                           # Drops everything queued, including what is playing
+
+Because the sink reports how far ahead of the speaker it is, every segment
+knows when its first and last samples are audible: finished fires then,
+not after a guessed delay.
+"""
+import queue
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+from audio_stream import PCM_SAMPLE_RATE, PCM_SAMPLE_WIDTH, PCM_CHANNELS
+
+try:
+    import pyaudio  # Optional: without it audio goes to a NullSink
+except ImportError:
+    pyaudio = None
+
+
+class Segment:
+    """One queued PCMBuffer and what has happened to it so far"""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.started = False       # First sample handed to the sink
+        self.tail = False          # Fully downloaded, and the sink is about to reach the end
+        self.drained = False       # Last sample handed to the sink (or stopped)
+        self.stopped = False
+        self.audible_at = None     # Sink clock time the first sample is heard
+        self.audible_until = None  # Sink clock time the last sample has been heard
+        self.finished = threading.Event()
+
+
+class PyAudioSink:
+    """The sound card, through a PyAudio callback stream"""
+
+    def __init__(self, output_device_index=None):
+        self.output_device_index = output_device_index
+        self.audio = None
+        self.stream = None
+        self.latency = 0.0
+
+    @staticmethod
+    def available():
+        return pyaudio is not None
+
+    def clock(self):
+        return time.monotonic()
+
+    def start(self, fill, sample_rate, block_bytes):
+        def callback(data, frame_count, time_info, status):
+            # Runs on PortAudio's thread: how far ahead of the speaker this buffer is
+            latency = time_info.get("output_buffer_dac_time", 0) - time_info.get("current_time", 0)
+            nbytes = frame_count * PCM_SAMPLE_WIDTH * PCM_CHANNELS
+            pcm = fill(nbytes, latency if 0 < latency < 1 else self.latency)
+            return (pcm if pcm is not None else bytes(nbytes)), pyaudio.paContinue
+
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=PCM_CHANNELS, rate=sample_rate, output=True,
+                                      frames_per_buffer=block_bytes // (PCM_SAMPLE_WIDTH * PCM_CHANNELS),
+                                      output_device_index=self.output_device_index, stream_callback=callback)
+        self.latency = self.stream.get_output_latency()
+        self.stream.start_stream()
+
+    def close(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.audio:
+            self.audio.terminate()
+
+
+class NullSink:
+    """Discards audio at the pace a sound card would play it (benchmarks, headless runs, tests).
+
+    With realtime=False a virtual clock advances by each block instead, so
+    queued audio is consumed as fast as the CPU allows.
+    """
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.closed = threading.Event()
+        self.virtual_time = time.monotonic()
+        self.thread = None
+
+    def clock(self):
+        return time.monotonic() if self.realtime else self.virtual_time
+
+    def start(self, fill, sample_rate, block_bytes):
+        self.block_seconds = block_bytes / float(sample_rate * PCM_SAMPLE_WIDTH * PCM_CHANNELS)
+        self.thread = threading.Thread(target=self._run, args=(fill, block_bytes), name="ada-audio-clock",
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self, fill, block_bytes):
+        next_block = time.monotonic()
+        while not self.closed.is_set():
+            pcm = fill(block_bytes, 0.0)
+            if pcm is not None:
+                self.write(pcm)
+            if self.realtime or pcm is None:
+                # Idle virtual clocks wait in real time too, instead of spinning
+                next_block = max(next_block + self.block_seconds, time.monotonic() - self.block_seconds)
+                self.closed.wait(max(0.0, next_block - time.monotonic()))
+            if not self.realtime:
+                self.virtual_time += self.block_seconds
+
+    def write(self, pcm):
+        pass
+
+    def close(self):
+        self.closed.set()
+        if self.thread:
+            self.thread.join(1.0)
+
+
+class FileSink(NullSink):
+    """Writes everything played (but not the idle time between replies) to a WAV file"""
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.path = path
+        self.wav = None
+
+    def start(self, fill, sample_rate, block_bytes):
+        self.wav = wave.open(self.path, "wb")
+        self.wav.setnchannels(PCM_CHANNELS)
+        self.wav.setsampwidth(PCM_SAMPLE_WIDTH)
+        self.wav.setframerate(sample_rate)
+        super().start(fill, sample_rate, block_bytes)
+
+    def write(self, pcm):
+        self.wav.writeframes(pcm)
+
+    def close(self):
+        super().close()
+        if self.wav:
+            self.wav.close()
+
+
+class AudioOutput:
+    """Plays queued PCMBuffers gaplessly through a sink that pulls audio from a callback.
+
+    A drop-in for the player the engine and apps use: play(buffer, on_start),
+    stop(), set_volume(), volume and monitor. monitor(pcm, audible_at,
+    sample_rate) gets every block played, time-stamped with when it will be
+    heard (the echo canceller's reference).
+    """
+
+    def __init__(self, sink=None, sample_rate=PCM_SAMPLE_RATE, jitter_ms=150, block_ms=20):
+        if sink is None:
+            if PyAudioSink.available():
+                sink = PyAudioSink()
+            else:
+                print("PyAudio not installed - audio output is discarded")
+                sink = NullSink()
+        self.sink = sink
+        self.sample_rate = sample_rate
+        bytes_per_ms = sample_rate * PCM_SAMPLE_WIDTH * PCM_CHANNELS / 1000.0
+        self.bytes_per_second = bytes_per_ms * 1000
+        self.jitter_bytes = int(jitter_ms * bytes_per_ms)  # Buffered before a segment starts, against underruns
+        self.block_bytes = int(block_ms * bytes_per_ms) // PCM_SAMPLE_WIDTH * PCM_SAMPLE_WIDTH
+        self.lead_bytes = 2 * self.block_bytes  # play() returns this early, so the next segment follows seamlessly
+        self.volume = 1.0
+        self.monitor = None
+        self.cond = threading.Condition()
+        self.segments = deque()  # Queued and playing, in order
+        self.finishing = []      # Drained, waiting for their last sample to be heard
+
+        # Counters
+        self.played = 0
+        self.stops = 0
+        self.underruns = 0
+        self.audio_seconds = 0.0
+
+        # monitor() runs on its own thread, so the sink's callback only copies bytes
+        self.monitored = queue.Queue()
+        threading.Thread(target=self._monitor_worker, name="ada-audio-monitor", daemon=True).start()
+        self.sink.start(self._fill, sample_rate, self.block_bytes)
+
+    def enqueue(self, buffer):
+        """Queue a PCMBuffer (which may still be downloading) behind everything queued; returns its Segment"""
+        segment = Segment(buffer)
+        with self.cond:
+            self.segments.append(segment)
+        return segment
+
+    def play(self, buffer, on_start=None):
+        """Queue a PCMBuffer and block until the sink is about to take its last samples.
+
+        on_start() is called (on this thread) once its first sample has been
+        handed to the sink. Returning a couple of blocks early lets the next
+        segment be queued in time to follow without a gap; wait_finished()
+        waits until it has all been heard. Returns True if anything was played.
+        """
+        segment = self.enqueue(buffer)
+        with self.cond:
+            self.cond.wait_for(lambda: segment.started or segment.drained)
+            started = segment.started
+        if started and on_start:
+            on_start()
+        with self.cond:
+            self.cond.wait_for(lambda: segment.drained or segment.tail)
+        return segment.started and not segment.stopped
+
+    def wait_finished(self, timeout=None):
+        """Block until everything queued has been heard (or stopped); False on timeout"""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.segments and not self.finishing, timeout)
+
+    def is_playing(self):
+        with self.cond:
+            return bool(self.segments or self.finishing)
+
+    def stop(self):
+        """Drop everything queued, including what is playing, from the next block on"""
+        with self.cond:
+            dropped = list(self.segments) + self.finishing
+            self.segments.clear()
+            self.finishing = []
+            for segment in dropped:
+                segment.stopped = True
+                segment.drained = True
+                segment.finished.set()
+            if dropped:
+                self.stops += 1
+            self.cond.notify_all()
+
+    def set_volume(self, volume):
+        """Output volume from 0.0 to 1.0; returns the value applied"""
+        self.volume = min(1.0, max(0.0, volume))
+        return self.volume
+
+    def _fill(self, nbytes, latency):
+        """Sink callback: the next nbytes of PCM, or None when there is nothing to play yet.
+
+        latency is how long until the first of these bytes reaches the speaker.
+        """
+        now = self.sink.clock()
+        pcm = bytearray()
+        with self.cond:
+            self._finish_heard(now)
+            while len(pcm) < nbytes and self.segments:
+                segment = self.segments[0]
+                buffer = segment.buffer
+                if not segment.started and not buffer.closed and buffer.buffered() < self.jitter_bytes:
+                    break  # Still filling the jitter buffer
+                offset = len(pcm)
+                chunk = buffer.read_nowait(nbytes - offset)
+                if chunk:
+                    pcm.extend(chunk)
+                    if not segment.started:
+                        segment.started = True
+                        segment.audible_at = now + latency + offset / self.bytes_per_second
+                if segment.started and buffer.closed and buffer.buffered() <= self.lead_bytes:
+                    segment.tail = True
+                if buffer.ended():
+                    self.segments.popleft()
+                    segment.drained = True
+                    segment.audible_until = now + latency + len(pcm) / self.bytes_per_second
+                    self.finishing.append(segment)
+                    if segment.started:
+                        self.played += 1
+                elif len(pcm) < nbytes:
+                    if segment.started:
+                        self.underruns += 1  # The download fell behind playback
+                    break
+            if not pcm:
+                return None
+            self.audio_seconds += len(pcm) / self.bytes_per_second
+            self.cond.notify_all()
+
+        if self.volume < 1.0:
+            pcm = bytearray((np.frombuffer(bytes(pcm), dtype=np.int16) * self.volume).astype(np.int16).tobytes())
+        if self.monitor:
+            self.monitored.put((bytes(pcm), now + latency))
+        return bytes(pcm.ljust(nbytes, b"\0"))
+
+    def _finish_heard(self, now):
+        """Set finished on drained segments whose last sample has been heard (cond held)"""
+        heard = [segment for segment in self.finishing if segment.audible_until <= now]
+        for segment in heard:
+            self.finishing.remove(segment)
+            segment.finished.set()
+        if heard:
+            self.cond.notify_all()
+
+    def _monitor_worker(self):
+        while True:
+            pcm, audible_at = self.monitored.get()
+            monitor = self.monitor
+            if monitor:
+                try:
+                    monitor(pcm, audible_at, self.sample_rate)
+                except Exception as e:
+                    print(f"Audio monitor failed: {e}")
+
+    def close(self):
+        self.stop()
+        self.sink.close()
+
+    def summary(self):
+        with self.cond:
+            return (f"{self.played} segment(s), {self.audio_seconds:.1f}s played, "
+                    f"{self.underruns} underrun(s), {self.stops} stop(s)")
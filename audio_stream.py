@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory streaming playback for Ada.
+
+ElevenLabs is asked for raw 16-bit PCM so the HTTP body can be played as it
+arrives: the download writes into a PCMBuffer and audio_output.AudioOutput
+starts output as soon as a small jitter buffer has filled. Nothing touches
+the disk.
+"""
+import threading
+import time
+
+
+PCM_SAMPLE_RATE = 22050       # Matches ElevenLabs output_format=pcm_22050
+PCM_OUTPUT_FORMAT = f"pcm_{PCM_SAMPLE_RATE}"
+PCM_SAMPLE_WIDTH = 2          # 16-bit signed little-endian
+PCM_CHANNELS = 1
+
+
+class PCMBuffer:
+    """Growing in-memory PCM buffer, filled by a download and drained by the player"""
+
+    def __init__(self, sample_rate=PCM_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.data = bytearray()
+        self.read_pos = 0
+        self.closed = False
+        self.first_byte_at = None  # time.monotonic() of the first write, for latency tracing
+        self.cond = threading.Condition()
+
+    def write(self, chunk):
+        """Append downloaded bytes"""
+        if not chunk:
+            return
+        with self.cond:
+            if self.first_byte_at is None:
+                self.first_byte_at = time.monotonic()
+            self.data.extend(chunk)
+            self.cond.notify_all()
+
+    def close(self):
+        """Mark the download as finished (successfully or not)"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def wait_for(self, nbytes, timeout=None):
+        """Wait until nbytes are buffered or the download ended; True if there is anything to play"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or len(self.data) - self.read_pos >= nbytes, timeout)
+            return len(self.data) > self.read_pos
+
+    def read(self, nbytes):
+        """Read up to nbytes of whole samples, blocking until that many are buffered or the stream ends.
+
+        Returns b"" once the stream has ended and everything has been read.
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or len(self.data) - self.read_pos >= nbytes)
+            end = min(self.read_pos + nbytes, len(self.data))
+            end -= (end - self.read_pos) % PCM_SAMPLE_WIDTH  # Never split a sample
+            chunk = bytes(self.data[self.read_pos:end])
+            self.read_pos = end
+            return chunk
+
+    def read_nowait(self, nbytes):
+        """Read up to nbytes of whole samples that are already buffered (for audio callbacks)"""
+        with self.cond:
+            end = min(self.read_pos + nbytes, len(self.data))
+            end -= (end - self.read_pos) % PCM_SAMPLE_WIDTH
+            chunk = bytes(self.data[self.read_pos:end])
+            self.read_pos = end
+            return chunk
+
+    def buffered(self):
+        """Bytes downloaded but not read yet"""
+        with self.cond:
+            return len(self.data) - self.read_pos
+
+    def ended(self):
+        """True once the download has finished and everything has been read"""
+        with self.cond:
+            return self.closed and self.read_pos >= len(self.data)
+
+    def getvalue(self):
+        """Everything downloaded so far"""
+        with self.cond:
+            return bytes(self.data)
+
+    def duration(self):
+        """Length of the buffered audio in seconds"""
+        return len(self.data) / float(self.sample_rate * PCM_SAMPLE_WIDTH * PCM_CHANNELS)
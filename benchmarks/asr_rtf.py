@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Real-time-factor comparison of speech recognition backends.
+
+Transcribes every WAV in the fixtures folder with each backend configuration
+and reports load time, real-time factor (processing time / audio length,
+lower is better) and, where a reference <name>.txt sits next to <name>.wav,
+word error rate. Use it to find the largest model that still fits the latency
+budget on a given box.
+
+    python benchmarks/asr_rtf.py
+    python benchmarks/asr_rtf.py --backends whisper:base faster-whisper:small:int8:4 --output rtf.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asr_backends import create_backend, parse_backend_spec, load_wav, SAMPLE_RATE
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_BACKENDS = [
+    "whisper:base",
+    "faster-whisper:base:int8",
+    "faster-whisper:small:int8",
+]
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = re.findall(r"[a-z0-9']+", reference.lower())
+    hyp = re.findall(r"[a-z0-9']+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / float(len(ref))
+
+
+def load_fixtures(folder):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8") as f:
+                reference = f.read().strip()
+        fixtures.append({"name": os.path.basename(path), "audio": load_wav(path), "reference": reference})
+    return fixtures
+
+
+def benchmark_backend(spec, fixtures, repeat):
+    backend = create_backend(parse_backend_spec(spec))
+    start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - start
+
+    # One untimed pass so lazy initialization doesn't count against the first clip
+    backend.transcribe(fixtures[0]["audio"])
+
+    clips = []
+    for fixture in fixtures:
+        duration = len(fixture["audio"]) / float(SAMPLE_RATE)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = backend.transcribe(fixture["audio"])
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        clip = {"name": fixture["name"], "duration": duration, "seconds": best, "rtf": best / duration, "text": text}
+        if fixture["reference"] is not None:
+            clip["wer"] = word_error_rate(fixture["reference"], text)
+        clips.append(clip)
+
+    total_audio = sum(c["duration"] for c in clips)
+    total_time = sum(c["seconds"] for c in clips)
+    wers = [c["wer"] for c in clips if "wer" in c]
+    return {
+        "backend": spec,
+        "description": backend.describe(),
+        "load_seconds": load_seconds,
+        "rtf": total_time / total_audio,
+        "wer": sum(wers) / len(wers) if wers else None,
+        "clips": clips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ASR backends by real-time factor")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Folder of .wav (+ optional .txt) files")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS,
+                        help="backend:model[:compute_type[:threads]] specs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per clip (best is kept)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No .wav fixtures found in {args.fixtures}")
+        return 1
+    total = sum(len(f["audio"]) for f in fixtures) / float(SAMPLE_RATE)
+    print(f"{len(fixtures)} fixtures, {total:.1f}s of audio\n")
+
+    results = []
+    for spec in args.backends:
+        try:
+            result = benchmark_backend(spec, fixtures, args.repeat)
+        except Exception as e:
+            print(f"{spec:32s} failed: {e}")
+            continue
+        results.append(result)
+        wer = f"{result['wer']:.1%}" if result["wer"] is not None else "n/a"
+        print(f"{spec:32s} load {result['load_seconds']:5.1f}s   RTF {result['rtf']:.3f}   WER {wer}"
+              f"   [{result['description']}]")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Offline end-to-end latency benchmark for Ada's voice engine.
+
+Plays the WAV fixtures into the real RealtimeSTT recorder (fed instead of a
+microphone) and lets the headless engine's own listen loop take each
+utterance through transcription, get_chatgpt_response and speak_text. OpenAI and ElevenLabs are
+replaced by local stand-ins (benchmarks/standins.py) and audio goes to a null
+sink, so a run needs no network, speakers or person at the microphone.
+
+Reports per-stage and end-to-end percentiles plus CPU time per turn, and can
+write everything as JSON for comparing runs across changes:
+
+    python benchmarks/e2e_latency.py --output before.json
+    python benchmarks/e2e_latency.py --set stt_silence_duration=0.8 --recorder model=small --output after.json
+    python benchmarks/e2e_latency.py --llm-first-token-ms 800 --error-rate 0.1
+
+Fixtures should be wake-word commands ("Hey Ada, what time is it?"); see
+benchmarks/fixtures/README.md.
+"""
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # The real player is swapped for a null sink
+
+from asr_rtf import load_fixtures, FIXTURES_DIR
+from standins import StandinServer, StandinConfig
+from audio_output import AudioOutput, NullSink
+from latency_trace import STAGES, SEGMENTS, percentile
+from ada_engine import AdaEngine, RecorderReady, TurnTraced
+from startup_profile import startup
+
+try:
+    import psutil  # Optional: also counts CPU used by RealtimeSTT's worker processes
+except ImportError:
+    psutil = None
+
+
+FEED_SAMPLE_RATE = 16000
+FEED_CHUNK = 512  # Samples per feed_audio call (32 ms), like a microphone callback
+
+
+def cpu_seconds():
+    """CPU time used by this process and, with psutil, its child processes"""
+    if psutil is None:
+        return time.process_time()
+    process = psutil.Process()
+    times = process.cpu_times()
+    total = times.user + times.system
+    for child in process.children(recursive=True):
+        try:
+            child_times = child.cpu_times()
+            total += child_times.user + child_times.system
+        except psutil.Error:
+            pass
+    return total
+
+
+def parse_value(text):
+    """Interpret a --set/--recorder value as JSON where possible (numbers, booleans), else a string"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_assignments(items):
+    settings = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"Expected key=value, got '{item}'")
+        settings[key] = parse_value(value)
+    return settings
+
+
+def create_engine(standin_url, settings, recorder_settings, cache_dir):
+    """Ada's engine with the microphone, speakers and cloud services swapped out"""
+    engine = AdaEngine(player=AudioOutput(NullSink()))
+    engine.openai_base_url = standin_url + "/v1"
+    engine.elevenlabs_base_url = standin_url
+    engine.tts_cache_dir = cache_dir
+    engine.conversation_store_path = os.path.join(cache_dir, "conversations.db")
+    engine.restore_exchanges = 0
+    engine.memory_dir = os.path.join(cache_dir, "memory")
+    engine.tracer.path = None  # Keep benchmark turns out of the user's trace file
+
+    for key, value in settings.items():
+        # Dotted keys reach into engine components, e.g. context.max_prompt_tokens
+        *path, name = key.split(".")
+        target = engine
+        for part in path:
+            target = getattr(target, part, None)
+        if target is None or not hasattr(target, name):
+            raise SystemExit(f"Unknown engine setting '{key}'")
+        setattr(target, name, value)
+    engine.recorder_config.update(recorder_settings)
+    engine.recorder_config['use_microphone'] = False  # Audio comes from feed_audio()
+    engine.capture_microphone = False                  # ... by way of engine.feed_microphone()
+    return engine
+
+
+class AudioFeeder:
+    """Feeds fixture audio into the recorder at real-time pace, with silence in between"""
+
+    def __init__(self, feed):
+        self.feed = feed  # feed(pcm) - the engine's microphone input
+        self.pending = queue.Queue()
+        self.running = True
+        self.silence = np.zeros(FEED_CHUNK, dtype=np.int16).tobytes()
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def play(self, audio):
+        """Queue float32 16 kHz audio; returns an Event set once it has all been fed"""
+        done = threading.Event()
+        samples = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        self.pending.put((samples, done))
+        return done
+
+    def _worker(self):
+        chunk_seconds = FEED_CHUNK / float(FEED_SAMPLE_RATE)
+        next_at = time.monotonic()
+        current, done, offset = None, None, 0
+        while self.running:
+            if current is None:
+                try:
+                    current, done = self.pending.get_nowait()
+                    offset = 0
+                except queue.Empty:
+                    pass
+
+            if current is not None:
+                chunk = current[offset:offset + FEED_CHUNK]
+                offset += FEED_CHUNK
+                data = np.pad(chunk, (0, FEED_CHUNK - len(chunk))).tobytes()
+                if offset >= len(current):
+                    current = None
+                    done.set()
+            else:
+                data = self.silence
+            self.feed(data)
+
+            next_at += chunk_seconds
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def stop(self):
+        self.running = False
+
+
+def summarize(turns):
+    """Percentiles per segment, per stage offset, for the whole turn and for CPU time"""
+    def stats(values):
+        values = [v for v in values if v is not None]
+        return {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "n": len(values)}
+
+    outcomes = {}
+    for turn in turns:
+        outcomes[turn.get("outcome", "unknown")] = outcomes.get(turn.get("outcome", "unknown"), 0) + 1
+
+    return {
+        "outcomes": outcomes,
+        "segments": {label: stats(t["segments"].get(label) for t in turns) for label, _, _ in SEGMENTS},
+        # Offsets are measured from vad_end, the first mark of every turn
+        "stages": {stage: stats(t["stages"].get(stage) for t in turns) for stage in STAGES},
+        "end_to_end": stats(max(t["stages"].values()) if t["stages"] else None for t in turns),
+        "cpu_ms": stats(t["cpu_ms"] for t in turns),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(summary):
+    def row(name, s):
+        if s["n"]:
+            print(f"  {name:<22} p50 {s['p50']:8.0f} ms   p95 {s['p95']:8.0f} ms   n={s['n']}")
+
+    print(f"\nOutcomes: {summary['outcomes']}")
+    print("Segments:")
+    for label, s in summary["segments"].items():
+        row(label, s)
+    print("Stage offsets from end of speech:")
+    for stage, s in summary["stages"].items():
+        row(stage, s)
+    print("Per turn:")
+    row("End to end", summary["end_to_end"])
+    row("CPU time", summary["cpu_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Folder of WAV utterances")
+    parser.add_argument("--repeat", type=int, default=1, help="Play every fixture this many times")
+    parser.add_argument("--gap", type=float, default=0.5, help="Extra silence between turns (s)")
+    parser.add_argument("--turn-timeout", type=float, default=60.0, help="Give up on a turn after this long (s)")
+    parser.add_argument("--set", action="append", metavar="NAME=VALUE",
+                        help="Engine setting, e.g. stt_silence_duration=0.8 or context.max_prompt_tokens=800")
+    parser.add_argument("--recorder", action="append", metavar="KEY=VALUE",
+                        help="recorder_config override, e.g. model=small or silero_sensitivity=0.3")
+    parser.add_argument("--llm-first-token-ms", type=float, default=350)
+    parser.add_argument("--llm-token-ms", type=float, default=25)
+    parser.add_argument("--llm-tokens-per-event", type=int, default=1)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=250)
+    parser.add_argument("--tts-speed", type=float, default=4.0, help="Audio seconds synthesized per second")
+    parser.add_argument("--buffered", action="store_true", help="Stand-ins send whole responses instead of streaming")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stand-in requests that fail")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No WAV fixtures in {args.fixtures} - see benchmarks/fixtures/README.md")
+        return 1
+
+    config = StandinConfig(llm_first_token_ms=args.llm_first_token_ms, llm_token_ms=args.llm_token_ms,
+                           llm_tokens_per_event=args.llm_tokens_per_event,
+                           tts_first_byte_ms=args.tts_first_byte_ms, tts_speed=args.tts_speed,
+                           buffered=args.buffered, error_rate=args.error_rate, seed=args.seed)
+    server = StandinServer(config).start()
+    settings = parse_assignments(args.set)
+    recorder_settings = parse_assignments(args.recorder)
+
+    with tempfile.TemporaryDirectory(prefix="ada_bench_cache_") as cache_dir:
+        engine = create_engine(server.url, settings, recorder_settings, cache_dir)
+        turns = queue.Queue()
+        ready = queue.Queue()
+
+        def on_event(event):
+            if isinstance(event, TurnTraced):
+                turns.put(event.entry)
+            elif isinstance(event, RecorderReady):
+                ready.put(event.error)
+
+        engine.subscribe(on_event)
+        engine.start()
+        error = ready.get()
+        if error:
+            print(f"RealtimeSTT failed to initialize: {error}")
+            engine.close()
+            server.close()
+            return 1
+
+        feeder = AudioFeeder(engine.feed_microphone).start()
+        engine.start_listening()
+        time.sleep(1.0)  # Let the VAD settle on silence
+
+        results = []
+        try:
+            for round_index in range(args.repeat):
+                for fixture in fixtures:
+                    duration = len(fixture["audio"]) / float(FEED_SAMPLE_RATE)
+                    cpu_start = cpu_seconds()
+                    fed = feeder.play(fixture["audio"])
+                    fed.wait()
+
+                    try:
+                        entry = turns.get(timeout=args.turn_timeout)
+                    except queue.Empty:
+                        print(f"{fixture['name']}: no turn within {args.turn_timeout:.0f}s")
+                        entry = {"outcome": "timeout", "stages": {}, "segments": {}}
+                    entry["cpu_ms"] = round((cpu_seconds() - cpu_start) * 1000, 1)
+                    entry["fixture"] = fixture["name"]
+                    entry["round"] = round_index
+                    entry["audio_seconds"] = round(duration, 2)
+                    results.append(entry)
+
+                    first_audio = entry["segments"].get("To first audio")
+                    print(f"{fixture['name']}: {entry.get('outcome')}, first audio "
+                          f"{'-' if first_audio is None else f'{first_audio:.0f} ms'}, cpu {entry['cpu_ms']:.0f} ms")
+
+                    # Drain stray turns (e.g. an utterance split in two) and respect the post-speech buffer
+                    time.sleep(engine.post_speech_buffer + args.gap)
+                    while not turns.empty():
+                        turns.get_nowait()
+        finally:
+            feeder.stop()
+            summary = summarize(results)
+            print_report(summary)
+            print(f"Stand-in requests: {server.requests()}")
+            engine.close()
+            server.close()
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "cpu_includes_children": psutil is not None,
+            "settings": settings,
+            "recorder_settings": recorder_settings,
+            "standins": config.to_dict(),
+            "summary": summary,
+            "startup": startup.as_dict(),  # Time-to-ready, to catch startup regressions too
+            "turns": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Load generator for Ada's multi-client voice server.
+
+Replays the WAV fixtures as N concurrent clients, each streaming its audio at
+real-time pace (with silence in between, like an open microphone) and timing
+how long after the end of each utterance the first audio of the reply comes
+back. The client count is stepped up until the p95 of that latency misses the
+target, and the largest count that met it is reported as sessions per core.
+
+By default the server runs in this process against the local OpenAI and
+ElevenLabs stand-ins, so only the ASR model is real:
+
+    python benchmarks/load_test.py --clients 1 2 4 8 12 --target-ms 1500
+    python benchmarks/load_test.py --asr faster-whisper:small:int8 --output batched.json
+    python benchmarks/load_test.py --asr faster-whisper:small:int8 --asr-max-batch 1 --output serial.json
+    python benchmarks/load_test.py --server 127.0.0.1:8765   # an already running voice_server.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+
+from asr_rtf import load_fixtures, FIXTURES_DIR
+from standins import StandinServer, StandinConfig
+from asr_backends import parse_backend_spec
+from latency_trace import percentile
+from voice_server import VoiceServer, encode_frame, read_frame
+
+try:
+    import psutil  # Optional: also counts CPU used by child processes
+except ImportError:
+    psutil = None
+
+
+FEED_SAMPLE_RATE = 16000
+FEED_CHUNK = 512  # Samples per audio frame (32 ms), like a microphone callback
+
+
+def cpu_seconds():
+    """CPU time used by this process and, with psutil, its child processes"""
+    if psutil is None:
+        return time.process_time()
+    process = psutil.Process()
+    times = process.cpu_times()
+    total = times.user + times.system
+    for child in process.children(recursive=True):
+        try:
+            child_times = child.cpu_times()
+            total += child_times.user + child_times.system
+        except psutil.Error:
+            pass
+    return total
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Client:
+    """One simulated room: streams fixtures to the server and times the replies"""
+
+    def __init__(self, index, address, fixtures, turns, gap, turn_timeout):
+        self.index = index
+        self.address = address
+        self.fixtures = fixtures
+        self.turns = turns
+        self.gap = gap
+        self.turn_timeout = turn_timeout
+        self.results = []
+        self.utterance_end = None
+        self.first_audio = None
+        self.turn_done = None
+
+    async def connect(self):
+        if isinstance(self.address, str):
+            return await asyncio.open_unix_connection(self.address)
+        return await asyncio.open_connection(*self.address)
+
+    async def run(self):
+        reader, writer = await self.connect()
+        writer.write(encode_frame(b"H", json.dumps({"session": f"load-{self.index}"}).encode("utf-8")))
+        receiver = asyncio.ensure_future(self.receive(reader))
+        silence = np.zeros(FEED_CHUNK, dtype=np.int16).tobytes()
+        clock = [time.monotonic()]
+
+        async def send(data):
+            writer.write(encode_frame(b"A", data))
+            await writer.drain()
+            clock[0] += FEED_CHUNK / float(FEED_SAMPLE_RATE)
+            await asyncio.sleep(max(0.0, clock[0] - time.monotonic()))
+
+        try:
+            await asyncio.sleep(random.uniform(0, 1.0))  # Rooms don't all start talking at once
+            clock[0] = time.monotonic()
+            for turn in range(self.turns):
+                fixture = self.fixtures[(self.index + turn) % len(self.fixtures)]
+                samples = (np.clip(fixture["audio"], -1.0, 1.0) * 32767).astype(np.int16)
+                self.first_audio = None
+                self.turn_done = asyncio.Event()
+                for offset in range(0, len(samples), FEED_CHUNK):
+                    chunk = samples[offset:offset + FEED_CHUNK]
+                    await send(np.pad(chunk, (0, FEED_CHUNK - len(chunk))).tobytes())
+                self.utterance_end = time.monotonic()
+
+                # Keep the microphone open (silence) until the reply is over
+                deadline = self.utterance_end + self.turn_timeout
+                while not self.turn_done.is_set() and time.monotonic() < deadline:
+                    await send(silence)
+                latency = (self.first_audio - self.utterance_end) * 1000 if self.first_audio else None
+                self.results.append({"client": self.index, "fixture": fixture["name"],
+                                     "first_audio_ms": latency, "completed": self.turn_done.is_set()})
+                for _ in range(int(self.gap * FEED_SAMPLE_RATE / FEED_CHUNK)):
+                    await send(silence)
+            writer.write(encode_frame(b"B", b""))
+            await writer.drain()
+        finally:
+            receiver.cancel()
+            writer.close()
+
+    async def receive(self, reader):
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                return
+            if kind == b"A" and self.first_audio is None and self.utterance_end is not None:
+                self.first_audio = time.monotonic()
+            elif kind == b"E":
+                event = json.loads(payload)
+                if event["type"] in ("turn", "error") and self.turn_done is not None:
+                    self.turn_done.set()
+
+
+async def run_level(address, fixtures, clients, turns, gap, turn_timeout):
+    swarm = [Client(index, address, fixtures, turns, gap, turn_timeout) for index in range(clients)]
+    await asyncio.gather(*(client.run() for client in swarm))
+    return [result for client in swarm for result in client.results]
+
+
+def summarize_level(clients, results, wall, cpu, target_ms):
+    latencies = [r["first_audio_ms"] for r in results if r["first_audio_ms"] is not None]
+    p95 = percentile(latencies, 0.95) if latencies else None
+    return {
+        "clients": clients,
+        "turns": len(results),
+        "answered": len(latencies),
+        "p50_ms": percentile(latencies, 0.5) if latencies else None,
+        "p95_ms": p95,
+        "cores_used": round(cpu / wall, 2) if wall else None,
+        "meets_target": p95 is not None and p95 <= target_ms and len(latencies) == len(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Folder of wake-word WAV utterances")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 12, 16],
+                        help="Concurrent client counts to try, in increasing order")
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per client at each level")
+    parser.add_argument("--gap", type=float, default=1.0, help="Silence after each reply (s)")
+    parser.add_argument("--turn-timeout", type=float, default=30.0)
+    parser.add_argument("--target-ms", type=float, default=1500, help="p95 end-of-speech to first audio")
+    parser.add_argument("--server", help="host:port or Unix socket path of a running server")
+    parser.add_argument("--asr", default="faster-whisper:base:int8", help="In-process server's ASR model")
+    parser.add_argument("--asr-workers", type=int, default=1)
+    parser.add_argument("--asr-max-batch", type=int, default=8, help="1 = no batching, to compare")
+    parser.add_argument("--asr-max-wait-ms", type=float, default=30)
+    parser.add_argument("--llm-first-token-ms", type=float, default=350)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=250)
+    parser.add_argument("--tts-cache", action="store_true",
+                        help="Let the server cache TTS (every stand-in reply is the same text, so this flatters it)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No WAV fixtures in {args.fixtures} - see benchmarks/fixtures/README.md")
+        return 1
+    random.seed(args.seed)
+
+    standins = server = None
+    if args.server:
+        host, sep, port = args.server.rpartition(":")
+        address = (host, int(port)) if sep and port.isdigit() else args.server
+    else:
+        config = StandinConfig(llm_first_token_ms=args.llm_first_token_ms,
+                               tts_first_byte_ms=args.tts_first_byte_ms, seed=args.seed)
+        standins = StandinServer(config).start()
+        server = VoiceServer(parse_backend_spec(args.asr), port=0, asr_workers=args.asr_workers,
+                             asr_max_batch=args.asr_max_batch, asr_max_wait_ms=args.asr_max_wait_ms,
+                             openai_base_url=standins.url + "/v1", elevenlabs_base_url=standins.url,
+                             tts_cache_dir=None, tts_memory_budget=64 * 1024 * 1024 if args.tts_cache else 0
+                             ).load().start()
+        address = (server.host, server.port)
+
+    levels = []
+    try:
+        for clients in args.clients:
+            wall_start, cpu_start = time.monotonic(), cpu_seconds()
+            results = asyncio.run(run_level(address, fixtures, clients, args.turns, args.gap, args.turn_timeout))
+            level = summarize_level(clients, results, time.monotonic() - wall_start,
+                                    cpu_seconds() - cpu_start, args.target_ms)
+            levels.append(level)
+            print(f"{clients:3d} client(s): p50 {level['p50_ms'] or 0:6.0f} ms, p95 {level['p95_ms'] or 0:6.0f} ms, "
+                  f"{level['answered']}/{level['turns']} answered, {level['cores_used']} cores busy"
+                  f"{'' if level['meets_target'] else '  <- misses target'}")
+            if not level["meets_target"]:
+                break
+    finally:
+        if server:
+            server.close()
+        if standins:
+            standins.close()
+
+    passing = [level for level in levels if level["meets_target"]]
+    cores = os.cpu_count() or 1
+    best = passing[-1]["clients"] if passing else 0
+    print(f"\n{best} concurrent session(s) within p95 {args.target_ms:.0f} ms on {cores} cores: "
+          f"{best / float(cores):.2f} sessions per core")
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "cpu_includes_children": psutil is not None,
+            "asr": args.asr if not args.server else None,
+            "target_ms": args.target_ms,
+            "cores": cores,
+            "sessions_per_core": best / float(cores),
+            "levels": levels,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
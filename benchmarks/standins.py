@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP stand-ins for the OpenAI and ElevenLabs APIs.
+
+One threaded server answers both, so the apps can be pointed at it through
+their base URL settings:
+
+    openai_base_url     = server.url + "/v1"
+    elevenlabs_base_url = server.url
+
+Latency, streaming granularity and error rate are configurable, which makes
+benchmark runs repeatable and independent of the real services.
+"""
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = ("Of course. I looked at what you asked and I think the short answer is yes. "
+                 "There are a couple of details worth mentioning, but nothing that should slow you down. "
+                 "Let me know if you want me to go through them.")
+
+
+class StandinConfig:
+    """Behaviour of the stand-in services (all times in milliseconds)"""
+
+    def __init__(self, llm_first_token_ms=350, llm_token_ms=25, llm_tokens_per_event=1, llm_reply=DEFAULT_REPLY,
+                 tts_first_byte_ms=250, tts_speed=4.0, tts_chunk_ms=100, tts_chars_per_second=15.0,
+                 buffered=False, error_rate=0.0, jitter=0.2, seed=None):
+        self.llm_first_token_ms = llm_first_token_ms      # Request to first streamed token
+        self.llm_token_ms = llm_token_ms                  # Gap between streamed events
+        self.llm_tokens_per_event = llm_tokens_per_event  # Tokens batched into one SSE event
+        self.llm_reply = llm_reply
+        self.tts_first_byte_ms = tts_first_byte_ms        # Request to first audio byte
+        self.tts_speed = tts_speed                        # Seconds of audio generated per wall-clock second
+        self.tts_chunk_ms = tts_chunk_ms                  # Audio per HTTP chunk
+        self.tts_chars_per_second = tts_chars_per_second  # Speaking rate, sets the audio length per text
+        self.buffered = buffered                          # Send whole responses at once instead of streaming
+        self.error_rate = error_rate                      # Fraction of requests answered with HTTP 500
+        self.jitter = jitter                              # +/- fraction applied to every delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self, ms):
+        """Sleep for ms with jitter applied"""
+        with self.lock:
+            factor = 1.0 + self.random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, ms * factor) / 1000.0)
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def to_dict(self):
+        return {k: v for k, v in vars(self).items() if k not in ("random", "lock", "llm_reply")}
+
+
+def tone(seconds, sample_rate, frequency=220.0, amplitude=2000):
+    """Quiet 16-bit mono sine so the audio isn't all zeros"""
+    count = int(seconds * sample_rate)
+    step = 2 * math.pi * frequency / sample_rate
+    return struct.pack(f"<{count}h", *(int(amplitude * math.sin(i * step)) for i in range(count)))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        # Connection pre-warming
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+        self.server.count(self.path)
+
+        if config.should_fail():
+            self.send_error_body(500, "Stand-in injected failure")
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self.chat_completion(body, config)
+        elif re.match(r"^/v1/text-to-speech/[^/]+/stream", self.path):
+            self.text_to_speech(body, config)
+        else:
+            self.send_error_body(404, f"No stand-in for {self.path}")
+
+    def send_error_body(self, status, message):
+        data = json.dumps({"error": {"message": message}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def chat_completion(self, body, config):
+        tokens = re.findall(r"\S+\s*", config.llm_reply)
+        per_event = max(1, config.llm_tokens_per_event)
+        if config.buffered:
+            per_event = len(tokens)  # Everything in one event after the full generation time
+        events = ["".join(tokens[i:i + per_event]) for i in range(0, len(tokens), per_event)]
+
+        config.delay(config.llm_first_token_ms)
+        if config.buffered:
+            config.delay(config.llm_token_ms * (len(tokens) - 1))
+        self.start_stream("text/event-stream")
+        for index, content in enumerate(events):
+            if index:
+                config.delay(config.llm_token_ms * per_event)
+            event = {
+                "id": "chatcmpl-standin",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "standin"),
+                "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+            }
+            self.send_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.send_chunk(b"")
+
+    def text_to_speech(self, body, config):
+        sample_rate = int(re.search(r"output_format=pcm_(\d+)", self.path).group(1)) \
+            if "output_format=pcm_" in self.path else 22050
+        seconds = max(0.3, len(body.get("text", "")) / config.tts_chars_per_second)
+        audio = tone(seconds, sample_rate)
+        chunk_bytes = max(2, int(sample_rate * config.tts_chunk_ms / 1000.0) * 2)
+
+        config.delay(config.tts_first_byte_ms)
+        if config.buffered:
+            config.delay(seconds * 1000.0 / config.tts_speed)
+            chunk_bytes = len(audio)
+        self.start_stream("audio/pcm")
+        for offset in range(0, len(audio), chunk_bytes):
+            if offset and not config.buffered:
+                config.delay(config.tts_chunk_ms / config.tts_speed)
+            self.send_chunk(audio[offset:offset + chunk_bytes])
+        self.send_chunk(b"")
+
+
+class StandinServer:
+    """Threaded local server answering OpenAI chat streaming and ElevenLabs TTS streaming"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StandinConfig()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self.httpd.requests = {}
+        self.httpd.count = self._count
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _count(self, path):
+        kind = "llm" if "chat/completions" in path else "tts" if "text-to-speech" in path else "other"
+        with self.config.lock:
+            self.httpd.requests[kind] = self.httpd.requests.get(kind, 0) + 1
+
+    def requests(self):
+        with self.config.lock:
+            return dict(self.httpd.requests)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
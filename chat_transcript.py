@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded chat transcript for the Tk windows.
+
+A Tk Text widget that is only ever appended to gets slower and bigger for as
+long as the app stays up. Instead, TranscriptModel keeps the most recent
+entries in memory and moves older ones to an on-disk JSONL archive, and
+TranscriptView renders only a window of entries: older ones are paged in
+from the model when the user scrolls to the top, and bursts of new entries
+are drawn in one widget update per frame.
+"""
+import json
+import os
+import threading
+import tkinter as tk
+from array import array
+from collections import deque
+from datetime import datetime
+from tkinter import ttk
+
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), ".ada_transcripts")
+
+
+def format_entry(entry):
+    timestamp, speaker, message = entry
+    return f"[{timestamp}] {speaker}: {message}\n\n"
+
+
+class TranscriptModel:
+    """Chat entries by index: the newest in memory, older ones in an archive file"""
+
+    def __init__(self, max_entries=500, archive_dir=DEFAULT_ARCHIVE_DIR):
+        self.max_entries = max_entries
+        self.entries = deque()    # (timestamp, speaker, message), newest last
+        self.first_index = 0      # Index of entries[0]
+        self.floor = 0            # Entries below this were cleared and are no longer shown
+        self.offsets = array("q")  # Archive byte offset of every archived entry
+        self.lock = threading.Lock()
+
+        self.archive = None
+        self.archive_path = None
+        if archive_dir:
+            # One archive per session
+            self.archive_path = os.path.join(archive_dir, datetime.now().strftime("%Y%m%d-%H%M%S") + ".jsonl")
+
+    def __len__(self):
+        with self.lock:
+            return self.first_index + len(self.entries)
+
+    def append(self, speaker, message, timestamp=None):
+        entry = (timestamp or datetime.now().strftime("%H:%M"), speaker, message)
+        with self.lock:
+            self.entries.append(entry)
+            if len(self.entries) > self.max_entries:
+                self._archive(len(self.entries) - self.max_entries)
+        return entry
+
+    def _archive(self, count):
+        """Move the oldest count entries from memory to the archive file (lock held)"""
+        archive = self._open_archive()
+        if archive:
+            archive.seek(0, os.SEEK_END)
+        for _ in range(count):
+            entry = self.entries.popleft()
+            if archive:
+                self.offsets.append(archive.tell())
+                archive.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self.first_index += count
+        if archive:
+            archive.flush()
+        else:
+            self.floor = max(self.floor, self.first_index)  # No archive: dropped for good
+
+    def _open_archive(self):
+        if self.archive is None and self.archive_path:
+            try:
+                os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+                self.archive = open(self.archive_path, "a+b")
+            except OSError as e:
+                print(f"Transcript archive unavailable, dropping old entries: {e}")
+                self.archive_path = None
+        return self.archive
+
+    def get(self, start, end):
+        """Entries start..end-1 (clamped to what is still visible)"""
+        with self.lock:
+            start = max(start, self.floor)
+            end = min(end, self.first_index + len(self.entries))
+            result = []
+            if start < self.first_index and self.archive:
+                for index in range(start, min(end, self.first_index)):
+                    self.archive.seek(self.offsets[index])
+                    result.append(tuple(json.loads(self.archive.readline())))
+            for index in range(max(start, self.first_index), end):
+                result.append(self.entries[index - self.first_index])
+            return result
+
+    def clear(self):
+        """Hide everything so far; it stays in the archive"""
+        with self.lock:
+            if self.entries:
+                self._archive(len(self.entries))
+            self.floor = self.first_index
+
+    def close(self):
+        with self.lock:
+            if self.archive:
+                self.archive.close()
+                self.archive = None
+
+
+class TranscriptView(ttk.Frame):
+    """Scrollable transcript that renders at most `window` entries of a TranscriptModel.
+
+    Call add() from the Tk thread only.
+    """
+
+    def __init__(self, parent, model=None, window=200, page=50, frame_ms=30, **text_options):
+        super().__init__(parent)
+        self.model = model or TranscriptModel()
+        self.window = window        # Most entries rendered at once
+        self.page = page            # Entries paged in per scroll to an edge
+        self.frame_ms = frame_ms    # Coalesce updates arriving within this many ms
+
+        self.text = tk.Text(self, wrap=tk.WORD, state=tk.DISABLED, **text_options)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.text.yview)
+        self.text.config(yscrollcommand=self.on_scroll)
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # Rendered entries are model indices start..end-1; line_counts has one item per entry
+        self.start = self.end = len(self.model)
+        self.line_counts = deque()
+        self.following = True       # Keep showing the newest entries
+        self.refresh_pending = None
+        self.paging = None
+
+    def add(self, speaker, message):
+        self.model.append(speaker, message)
+        if self.refresh_pending is None:
+            self.refresh_pending = self.after(self.frame_ms, self.refresh)
+
+    def clear(self):
+        self.model.clear()
+        self._edit(lambda: self.text.delete("1.0", tk.END))
+        self.start = self.end = len(self.model)
+        self.line_counts.clear()
+        self.following = True
+
+    def refresh(self):
+        """Draw every entry added since the last frame in one update"""
+        self.refresh_pending = None
+        total = len(self.model)
+        if not self.following or self.end >= total:
+            return
+
+        if total - self.end > self.window:
+            # Too far behind to append - redraw just the newest window
+            self._edit(lambda: self.text.delete("1.0", tk.END))
+            self.line_counts.clear()
+            self.start = self.end = total - self.window
+
+        self._insert_end(self.model.get(self.end, total))
+        self._trim_top()
+        self.text.see(tk.END)
+
+    def on_scroll(self, first, last):
+        """yscrollcommand: update the scrollbar and page entries in at the edges"""
+        self.scrollbar.set(first, last)
+        first, last = float(first), float(last)
+        if first <= 0.0 and self.start > self.model.floor:
+            self._schedule_page(self.page_older)
+        elif last >= 1.0:
+            if self.end < len(self.model):
+                self._schedule_page(self.page_newer)
+            else:
+                self.following = True
+        else:
+            self.following = False
+
+    def _schedule_page(self, page):
+        if self.paging is None:
+            self.paging = self.after_idle(page)
+
+    def page_older(self):
+        self.paging = None
+        new_start = max(self.model.floor, self.start - self.page)
+        entries = self.model.get(new_start, self.start)
+        if not entries:
+            return
+
+        top_line = int(self.text.index("@0,0").split(".")[0])
+        counts = [format_entry(entry).count("\n") for entry in entries]
+        text = "".join(format_entry(entry) for entry in entries)
+        self._edit(lambda: self.text.insert("1.0", text))
+        self.line_counts.extendleft(reversed(counts))
+        self.start = new_start
+        self.text.yview(f"{top_line + sum(counts)}.0")  # Keep what the user was reading in place
+
+        # Drop entries off the bottom to stay within the window
+        while len(self.line_counts) > self.window:
+            self._delete_last()
+        self.following = False
+
+    def page_newer(self):
+        self.paging = None
+        entries = self.model.get(self.end, self.end + self.page)
+        if not entries:
+            return
+        top_line = int(self.text.index("@0,0").split(".")[0])
+        self._insert_end(entries)
+        removed = self._trim_top()
+        self.text.yview(f"{max(1, top_line - removed)}.0")
+
+    def _insert_end(self, entries):
+        if not entries:
+            return
+        self._edit(lambda: self.text.insert("end-1c", "".join(format_entry(entry) for entry in entries)))
+        self.line_counts.extend(format_entry(entry).count("\n") for entry in entries)
+        self.end += len(entries)
+
+    def _trim_top(self):
+        """Drop the oldest rendered entries beyond the window; returns the lines removed"""
+        removed = 0
+        while len(self.line_counts) > self.window:
+            lines = self.line_counts.popleft()
+            self._edit(lambda: self.text.delete("1.0", f"{lines + 1}.0"))
+            self.start += 1
+            removed += lines
+        return removed
+
+    def _delete_last(self):
+        lines = self.line_counts.pop()
+        last_line = int(self.text.index("end-1c").split(".")[0])
+        self._edit(lambda: self.text.delete(f"{last_line - lines}.0", "end-1c"))
+        self.end -= 1
+
+    def _edit(self, change):
+        # The widget is read-only for the user; unlock it just for our own edits
+        self.text.config(state=tk.NORMAL)
+        change()
+        self.text.config(state=tk.DISABLED)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Token-budgeted conversation context for Ada's chat completions.
+
+Instead of resending the last N messages verbatim, ConversationContext keeps
+the prompt under a token budget: the system prompt, a rolling summary of
+older turns, any recalled memories and as many recent messages as fit. Token
+counts are cached per message, so building a prompt only counts the new user
+message (and the memories, if any). Exchanges that fall out of the window
+are folded into the summary by a background LLM call, off the response path.
+
+Counts use tiktoken when it is installed and a characters/4 estimate when
+it isn't. tiktoken is imported on the first count, not when this module is.
+"""
+import importlib.util
+import threading
+
+HAVE_TIKTOKEN = importlib.util.find_spec("tiktoken") is not None
+
+
+MESSAGE_OVERHEAD = 4  # Role and separators each message adds on top of its content
+REPLY_PRIMER = 3      # Tokens the API adds to prime the assistant's reply
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+MEMORY_PREFIX = "Relevant things from earlier conversations (mention only if useful):\n"
+SUMMARY_INSTRUCTIONS = ("You maintain a running summary of a voice conversation between a user and Ada. "
+                        "Merge the previous summary and the new messages into one short paragraph. Keep names, "
+                        "facts, preferences and open questions; drop small talk. Reply with the summary only.")
+
+
+class TokenCounter:
+    """Counts tokens the way the chat model does (or estimates without tiktoken)"""
+
+    def __init__(self, model="gpt-3.5-turbo"):
+        self.model = model
+        self.encoding = None
+        self.loaded = not HAVE_TIKTOKEN  # Nothing to load without tiktoken
+        self.lock = threading.Lock()
+
+    def _load(self):
+        with self.lock:
+            if not self.loaded:
+                import tiktoken
+                try:
+                    self.encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self.encoding = tiktoken.get_encoding("cl100k_base")
+                self.loaded = True
+        return self.encoding
+
+    def __call__(self, text):
+        encoding = self.encoding if self.loaded else self._load()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return (len(text) + 3) // 4
+
+    def message(self, message):
+        return self(message["content"]) + MESSAGE_OVERHEAD
+
+
+def summarize_conversation(openai_client, previous_summary, messages, model="gpt-3.5-turbo", max_tokens=200):
+    """Ask the model to fold messages into the running summary; returns the new summary"""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = openai_client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+            {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ],
+        max_tokens=max_tokens,
+        temperature=0.3,
+    )
+    return response.choices[0].message.content.strip()
+
+
+class ConversationContext:
+    """System prompt + rolling summary + recent messages, kept under max_prompt_tokens.
+
+    summarize(previous_summary, messages) returns the new summary text; without it,
+    evicted messages are simply dropped.
+    """
+
+    def __init__(self, system_prompt, max_prompt_tokens=1800, min_recent_messages=2,
+                 summarize=None, model="gpt-3.5-turbo", max_memory_tokens=300):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_memory_tokens = max_memory_tokens  # Share of the budget recalled memories may use
+        self.min_recent_messages = min_recent_messages  # Always keep at least the last exchange
+        self.summarize = summarize
+        self.count = TokenCounter(model)
+        self.lock = threading.Lock()
+
+        self.system = {"role": "system", "content": system_prompt}
+        self.system_tokens = self.count.message(self.system)
+        self.recent = []           # [(message, tokens)], oldest first
+        self.recent_tokens = 0
+        self.summary_text = ""
+        self.summary_tokens = 0
+        self.evicted = []          # Messages waiting to be folded into the summary
+        self.summarizing = False
+        self.generation = 0        # Bumped by clear() so a summary in flight is discarded
+        self.revision = 0          # Bumped whenever the history changes, so stale prompts can be detected
+
+        # Figures for tuning the budget against measured latency
+        self.last_prompt_tokens = 0
+        self.prompts_built = 0
+        self.prompt_tokens_total = 0
+        self.max_prompt_seen = 0
+        self.messages_summarized = 0
+
+    def build(self, user_message, memories=None, speculative=False):
+        """Messages to send for user_message (not yet committed to the history).
+
+        memories are past exchanges recalled by MemoryIndex.search; they are added as a
+        system message, best first, up to max_memory_tokens. speculative=True builds the
+        same prompt without evicting or counting anything, for a request that may be discarded.
+        """
+        user = {"role": "user", "content": user_message}
+        user_tokens = self.count.message(user)
+        with self.lock:
+            memory = self._memory_message(memories)
+            memory_tokens = self.count.message(memory) if memory else 0
+            fixed = self.system_tokens + self.summary_tokens + memory_tokens + user_tokens + REPLY_PRIMER
+
+            # Drop the oldest exchanges until the prompt fits
+            start, recent_tokens = 0, self.recent_tokens
+            while fixed + recent_tokens > self.max_prompt_tokens and len(self.recent) - start > self.min_recent_messages:
+                for _ in range(2 if len(self.recent) - start - self.min_recent_messages >= 2 else 1):
+                    recent_tokens -= self.recent[start][1]
+                    start += 1
+
+            messages = [self.system]
+            if self.summary_text:
+                messages.append({"role": "system", "content": SUMMARY_PREFIX + self.summary_text})
+            if memory:
+                messages.append(memory)
+            messages.extend(message for message, _ in self.recent[start:])
+            messages.append(user)
+            if speculative:
+                return messages
+
+            # Evicted messages go to the summary
+            self.evicted.extend(message for message, _ in self.recent[:start])
+            del self.recent[:start]
+            self.recent_tokens = recent_tokens
+
+            prompt_tokens = fixed + self.recent_tokens
+            self.last_prompt_tokens = prompt_tokens
+            self.prompts_built += 1
+            self.prompt_tokens_total += prompt_tokens
+            self.max_prompt_seen = max(self.max_prompt_seen, prompt_tokens)
+            fold = self.evicted and not self.summarizing
+            if fold:
+                self.summarizing = True
+
+        if fold:
+            threading.Thread(target=self._fold_evicted, daemon=True).start()
+        return messages
+
+    def _memory_message(self, memories):
+        """System message for recalled exchanges not already in the window (lock held)"""
+        if not memories:
+            return None
+        present = {message["content"] for message, _ in self.recent}
+        lines, tokens = [], self.count(MEMORY_PREFIX)
+        for memory in memories:
+            if memory["user"] in present:
+                continue
+            line = f"- User: {memory['user']} / Ada: {memory['reply']}"
+            line_tokens = self.count(line) + 1
+            if tokens + line_tokens > self.max_memory_tokens:
+                break
+            lines.append(line)
+            tokens += line_tokens
+        if not lines:
+            return None
+        return {"role": "system", "content": MEMORY_PREFIX + "\n".join(lines)}
+
+    def add_exchange(self, user_message, reply):
+        """Commit a completed user/assistant exchange to the history"""
+        with self.lock:
+            self.revision += 1
+            for message in ({"role": "user", "content": user_message}, {"role": "assistant", "content": reply}):
+                tokens = self.count.message(message)
+                self.recent.append((message, tokens))
+                self.recent_tokens += tokens
+
+    def _fold_evicted(self):
+        while True:
+            with self.lock:
+                batch, self.evicted = self.evicted, []
+                previous = self.summary_text
+                generation = self.generation
+                if not batch:
+                    self.summarizing = False
+                    return
+
+            summary = previous
+            if self.summarize:
+                try:
+                    summary = self.summarize(previous, batch)
+                except Exception as e:
+                    print(f"Could not summarize older conversation: {e}")
+
+            with self.lock:
+                if self.generation == generation:  # Not cleared meanwhile
+                    self.summary_text = summary
+                    self.summary_tokens = self.count.message({"content": SUMMARY_PREFIX + summary}) if summary else 0
+                    self.messages_summarized += len(batch)
+
+    def clear(self):
+        """Forget everything but the system prompt"""
+        with self.lock:
+            self.recent = []
+            self.recent_tokens = 0
+            self.summary_text = ""
+            self.summary_tokens = 0
+            self.evicted = []
+            self.generation += 1
+            self.revision += 1
+
+    def summary(self):
+        with self.lock:
+            average = self.prompt_tokens_total / self.prompts_built if self.prompts_built else 0
+            return (f"{self.prompts_built} prompts, avg {average:.0f} / max {self.max_prompt_seen} tokens "
+                    f"(budget {self.max_prompt_tokens}), {self.messages_summarized} messages folded into the summary")
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Durable conversation log for Ada.
+
+Every exchange is appended to a SQLite database in WAL mode, indexed by
+session and time. Writes are queued and committed in batches by a background
+thread, so nothing on the response path waits for the disk. Clearing the chat
+appends a marker instead of deleting anything; on startup the turns after the
+last marker are read back newest-first through the primary key, which costs
+the same whether the log holds a week or years of conversations.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".ada_conversations.db")
+
+CLEAR_MARKER = "clear"  # role of the row written when the chat is cleared
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    created REAL NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session, created);
+CREATE INDEX IF NOT EXISTS turns_created ON turns (created);
+"""
+
+
+class ConversationStore:
+    """Append-only SQLite conversation log with batched background writes"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, flush_interval=1.0, batch_size=64):
+        self.path = path
+        self.flush_interval = flush_interval  # Longest a write waits to be committed
+        self.batch_size = batch_size
+        self.session = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.writes = queue.Queue()
+        self.rows_written = 0
+
+        # Reads use this connection; the writer thread opens its own
+        self.lock = threading.Lock()
+        self.conn = self._connect()
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+        self.writer = threading.Thread(target=self._writer, daemon=True)
+        self.writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; plenty for a chat log
+        return conn
+
+    def append(self, role, content):
+        """Queue one message for writing (returns immediately)"""
+        self.writes.put((self.session, time.time(), role, content))
+
+    def append_exchange(self, user_message, reply):
+        self.append("user", user_message)
+        self.append("assistant", reply)
+
+    def mark_cleared(self):
+        """Later startups won't restore anything before this point"""
+        self.append(CLEAR_MARKER, "")
+
+    def recent_exchanges(self, count):
+        """The last count (user, assistant) pairs since the chat was last cleared, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT role, content FROM turns ORDER BY id DESC LIMIT ?", (count * 2 + 1,)).fetchall()
+
+        exchanges = []
+        reply = None
+        for role, content in rows:
+            if role == CLEAR_MARKER:
+                break
+            if role == "assistant":
+                reply = content
+            elif role == "user" and reply is not None:
+                exchanges.append((content, reply))
+                reply = None
+        exchanges.reverse()
+        return exchanges[-count:] if count else []
+
+    def session_turns(self, session=None):
+        """Every message of a session (default: this one) as (created, role, content)"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT created, role, content FROM turns WHERE session = ? AND role != ? ORDER BY created",
+                (session or self.session, CLEAR_MARKER)).fetchall()
+
+    def exchanges_after(self, last_id, limit=256):
+        """Complete exchanges logged after row last_id, for incremental indexing.
+
+        Returns ([(row_id, created, user_message, reply)], new_last_id).
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, created, role, content FROM turns WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, limit)).fetchall()
+
+        exchanges = []
+        for index, (row_id, created, role, content) in enumerate(rows):
+            if role == "user" and index + 1 < len(rows) and rows[index + 1][2] == "assistant":
+                exchanges.append((rows[index + 1][0], created, content, rows[index + 1][3]))
+            if role != "user" or index + 1 < len(rows):
+                last_id = row_id  # A user row at the very end may still get its reply next time
+        return exchanges, last_id
+
+    def _writer(self):
+        conn = self._connect()
+        running = True
+        while running:
+            item = self.writes.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Collect until the batch is full or the oldest write has waited flush_interval
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                    deadline = 0  # Flush requested: write now
+                else:
+                    batch.append(item)
+                if not running or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self.writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO turns (session, created, role, content) VALUES (?, ?, ?, ?)",
+                                         batch)
+                    self.rows_written += len(batch)
+                except sqlite3.Error as e:
+                    print(f"Could not write conversation log: {e}")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is committed"""
+        done = threading.Event()
+        self.writes.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self.writes.put(None)
+        self.writer.join(timeout=5.0)
+        with self.lock:
+            self.conn.close()
+
+    def summary(self):
+        return f"{self.rows_written} messages logged this session to {self.path}"
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Acoustic echo cancellation for Ada.
+
+Instead of muting the microphone while Ada talks, the audio being played is
+used as a reference signal: every block the player hands to the sound card
+is time-stamped into a reference timeline, and a frequency-domain adaptive
+filter (partitioned-block NLMS, overlap-save) learns the echo path from the
+speaker to the microphone and subtracts its estimate from the mic input.
+Adaptation freezes while the user talks over Ada (double-talk), and that
+same detector is what lets the engine stop playback on barge-in.
+
+Everything is vectorized in NumPy; a 16 ms block with a 256 ms echo tail
+costs well under a millisecond.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+
+MIC_SAMPLE_RATE = 16000  # What RealtimeSTT expects from feed_audio
+MIC_FRAME = 512          # Samples per microphone callback (32 ms)
+
+
+def pcm_to_float(data):
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def float_to_pcm(samples):
+    return (np.clip(samples, -1.0, 1.0 - 1.0 / 32768) * 32768).astype(np.int16).tobytes()
+
+
+class EchoCanceller:
+    """Subtracts the echo of played audio from 16 kHz mono microphone audio.
+
+    Call add_reference() with everything that is played and process() with
+    everything the microphone records, each with the time.monotonic() it was
+    played / captured. The filter covers echoes up to filter_ms after the
+    reference (plus delay_ms of fixed device latency).
+    """
+
+    def __init__(self, sample_rate=MIC_SAMPLE_RATE, block_size=256, filter_ms=256, step_size=0.5,
+                 delay_ms=0, suppression=0.3, near_end_ratio=0.5, geigel_threshold=0.6, history_seconds=10):
+        self.sample_rate = sample_rate
+        self.block = block_size
+        self.partitions = max(1, int(np.ceil(filter_ms / 1000.0 * sample_rate / block_size)))
+        self.step_size = step_size                # NLMS step (0-1); lower adapts slower but steadier
+        self.delay = int(delay_ms / 1000.0 * sample_rate)
+        self.suppression = suppression            # Gain on the residual while only Ada is talking
+        self.near_end_ratio = near_end_ratio      # Residual louder than this x the echo estimate = user talking
+        self.geigel_threshold = geigel_threshold  # Mic peak vs reference peak before the filter has converged
+
+        bins = block_size + 1
+        self.weights = np.zeros((self.partitions, bins), dtype=np.complex64)
+        self.spectra = np.zeros((self.partitions, bins), dtype=np.complex64)  # Reference block spectra, newest first
+        self.power = np.zeros(bins, dtype=np.float32)
+        self.previous_reference = np.zeros(block_size, dtype=np.float32)
+        self.reference_peaks = deque([0.0] * self.partitions, maxlen=self.partitions)
+
+        # Reference timeline: sample index = (time - origin) * sample_rate, kept in a ring buffer
+        self.origin = time.monotonic()
+        self.history = np.zeros(int(history_seconds * sample_rate), dtype=np.float32)
+        self.written = 0
+        self.lock = threading.Lock()
+
+        # Microphone stream position (timeline index of the next mic sample) and unprocessed samples
+        self.position = None
+        self.pending = np.zeros(0, dtype=np.float32)
+
+        # Echo return loss enhancement, smoothed, to tell when the filter has converged
+        self.echo_energy = 1e-9
+        self.residual_energy = 1e-9
+        self.near_end_until = 0.0
+
+        # Counters
+        self.blocks = 0
+        self.far_end_blocks = 0
+        self.double_talk_blocks = 0
+
+    def _index(self, at):
+        return int(round((at - self.origin) * self.sample_rate))
+
+    def add_reference(self, data, started_at, sample_rate):
+        """Record PCM (16-bit mono) that the player started at started_at (time.monotonic())"""
+        samples = pcm_to_float(data)
+        if sample_rate != self.sample_rate:
+            count = int(len(samples) * self.sample_rate / sample_rate)
+            samples = np.interp(np.arange(count) * (sample_rate / self.sample_rate),
+                                np.arange(len(samples)), samples).astype(np.float32)
+        start = self._index(started_at)
+        size = len(self.history)
+        with self.lock:
+            if start > self.written:
+                gap = np.arange(max(self.written, start - size), start)
+                self.history[gap % size] = 0.0  # Silence between replies
+            self.history[np.arange(start, start + len(samples)) % size] = samples
+            self.written = max(self.written, start + len(samples))
+
+    def _reference(self, start, count):
+        indices = np.arange(start, start + count)
+        with self.lock:
+            valid = (indices < self.written) & (indices >= max(0, self.written - len(self.history)))
+            return np.where(valid, self.history[indices % len(self.history)], 0.0).astype(np.float32)
+
+    def process(self, data, captured_at=None):
+        """Clean a block of 16-bit mono mic PCM whose last sample was captured at captured_at.
+
+        Returns the cleaned PCM; block_size samples at a time are processed, so the
+        result can lag the input by less than one block.
+        """
+        samples = pcm_to_float(data)
+        end = self._index(captured_at if captured_at is not None else time.monotonic()) - self.delay
+        if self.position is None or abs(end - (self.position + len(self.pending) + len(samples))) > self.sample_rate // 20:
+            # First block, or the clock drifted more than 50 ms from the sample count: resync
+            self.position = end - len(samples) - len(self.pending)
+
+        self.pending = np.concatenate([self.pending, samples])
+        cleaned = []
+        while len(self.pending) >= self.block:
+            block, self.pending = self.pending[:self.block], self.pending[self.block:]
+            cleaned.append(self._process_block(block, self._reference(self.position, self.block)))
+            self.position += self.block
+        return float_to_pcm(np.concatenate(cleaned)) if cleaned else b""
+
+    def _process_block(self, mic, reference):
+        n = self.block
+        self.blocks += 1
+        self.reference_peaks.append(float(np.abs(reference).max()))
+        far_end = max(self.reference_peaks) > 1e-3  # Something audible within the echo tail
+
+        # Overlap-save: filter the last two reference blocks, keep the second half
+        spectrum = np.fft.rfft(np.concatenate([self.previous_reference, reference]))
+        self.previous_reference = reference
+        self.spectra[1:] = self.spectra[:-1]
+        self.spectra[0] = spectrum
+        echo = np.fft.irfft((self.weights * self.spectra).sum(axis=0), 2 * n)[n:].astype(np.float32)
+        residual = mic - echo
+
+        if not far_end:
+            return mic
+
+        self.far_end_blocks += 1
+        mic_energy = float(np.dot(mic, mic))
+        residual_energy = float(np.dot(residual, residual))
+        echo_estimate = float(np.dot(echo, echo))
+        converged = self.echo_energy > 4 * self.residual_energy  # ERLE above 6 dB
+
+        # Double-talk: the residual is much more than leftover echo (or, untrained, the mic outpeaks the speaker)
+        if converged:
+            near_end = residual_energy > self.near_end_ratio * echo_estimate + 1e-6 * n
+        else:
+            near_end = np.abs(mic).max() > self.geigel_threshold * max(self.reference_peaks)
+
+        if near_end:
+            self.double_talk_blocks += 1
+            self.near_end_until = time.monotonic() + 0.3
+            return residual
+
+        # Normalized gradient step, constrained so each partition stays a linear convolution
+        self.echo_energy = 0.95 * self.echo_energy + 0.05 * mic_energy
+        self.residual_energy = 0.95 * self.residual_energy + 0.05 * residual_energy
+        self.power = 0.9 * self.power + 0.1 * (np.abs(spectrum) ** 2)
+        error = np.fft.rfft(np.concatenate([np.zeros(n, dtype=np.float32), residual]))
+        gradient = np.conj(self.spectra) * (error * (self.step_size / (self.partitions * self.power + 1e-6)))
+        taps = np.fft.irfft(gradient, 2 * n, axis=1)
+        taps[:, n:] = 0.0
+        self.weights += np.fft.rfft(taps, axis=1).astype(np.complex64)
+
+        return residual * self.suppression
+
+    def near_end_active(self):
+        """True while (and shortly after) the user talks over the played audio"""
+        return time.monotonic() < self.near_end_until
+
+    def erle_db(self):
+        return 10 * np.log10(self.echo_energy / self.residual_energy)
+
+    def summary(self):
+        return (f"{self.far_end_blocks}/{self.blocks} blocks during playback, "
+                f"{self.double_talk_blocks} double-talk, echo reduced by {self.erle_db():.1f} dB")
+
+
+class MicrophoneCapture:
+    """Reads the microphone with PyAudio and hands each frame to on_audio(pcm, captured_at)"""
+
+    def __init__(self, on_audio, sample_rate=MIC_SAMPLE_RATE, frames_per_buffer=MIC_FRAME, input_device_index=None):
+        self.on_audio = on_audio
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.input_device_index = input_device_index
+        self.frames = queue.Queue()
+        self.audio = None
+        self.stream = None
+
+    @staticmethod
+    def available():
+        return pyaudio is not None
+
+    def start(self):
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+                                      frames_per_buffer=self.frames_per_buffer,
+                                      input_device_index=self.input_device_index,
+                                      stream_callback=self._callback)
+        threading.Thread(target=self._worker, daemon=True).start()
+        return self
+
+    def _callback(self, data, frame_count, time_info, status):
+        # Runs on PortAudio's thread: just timestamp and queue
+        self.frames.put((data, time.monotonic()))
+        return None, pyaudio.paContinue
+
+    def _worker(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            try:
+                self.on_audio(*item)
+            except Exception as e:
+                print(f"Microphone frame dropped: {e}")
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.audio.terminate()
+            self.stream = None
+        self.frames.put(None)
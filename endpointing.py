@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive end-of-turn detection for Ada.
+
+A fixed post-speech silence timeout makes every command wait the full
+timeout. The Endpointer instead watches the (echo-cancelled) microphone
+audio and the realtime partial transcript and decides how much trailing
+silence to require for this utterance:
+
+- a partial that reads like a finished sentence commits after a few
+  hundred milliseconds;
+- one that ends in "and", "um", "the"... (or is just the wake word) waits
+  for the full timeout;
+- anything else waits a little longer than this speaker's usual mid-turn
+  pauses, measured as they talk;
+- a clean drop to the noise floor shortens the wait, lingering energy
+  (breath, a trailing "mmm") lengthens it.
+
+Speech probability comes from WebRTC VAD when it is installed, smoothed
+over frames, and from energy over the tracked noise floor otherwise.
+"""
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+
+VAD_FRAME = 480  # 30 ms at 16 kHz, a frame size WebRTC VAD accepts
+
+# Partial transcripts ending in one of these words aren't finished yet
+CONTINUATIONS = {
+    "and", "but", "or", "so", "because", "if", "then", "that", "which", "who", "when", "where", "while",
+    "to", "of", "for", "with", "about", "from", "in", "on", "at", "by", "like", "than",
+    "the", "a", "an", "my", "your", "his", "her", "their", "our", "this", "these", "those",
+    "is", "are", "was", "were", "be", "can", "could", "would", "should", "will", "do", "does",
+    "um", "uh", "er", "erm", "hmm", "mm", "well",
+}
+SENTENCE_END = re.compile(r"[.!?]['\")\]]*\s*$")
+
+
+def completeness(text, wake_words=()):
+    """+1 for a partial that reads as a finished sentence, -1 for one that clearly isn't, else 0"""
+    text = text.strip()
+    words = re.findall(r"[a-z']+", text.lower())
+    if not words:
+        return 0  # No partial transcript to go by
+    if " ".join(words) in wake_words:
+        return -1
+    if words[-1] in CONTINUATIONS or text.endswith((",", "...", "-", "…")):
+        return -1
+    if SENTENCE_END.search(text):
+        return 1
+    return 0
+
+
+class Endpointer:
+    """Decides when a turn is over from 16 kHz mono audio frames plus the partial transcript.
+
+    on_end(silence_seconds) is called (from the feeding thread) once per utterance.
+    """
+
+    def __init__(self, on_end, sample_rate=16000, min_silence=0.25, max_silence=1.5, complete_silence=0.3,
+                 default_pause=0.5, min_speech=0.3, vad_mode=2, wake_words=()):
+        self.on_end = on_end
+        self.sample_rate = sample_rate
+        self.min_silence = min_silence            # Never commit sooner than this
+        self.max_silence = max_silence            # Never wait longer than this (the old fixed timeout)
+        self.complete_silence = complete_silence  # Wait after a partial that reads as a finished sentence
+        self.default_pause = default_pause        # Assumed mid-turn pause until we've measured the speaker
+        self.min_speech = min_speech              # Ignore clicks and coughs shorter than this
+        self.wake_words = {w.lower() for w in wake_words}
+        self.vad = webrtcvad.Vad(vad_mode) if webrtcvad is not None else None
+        self.lock = threading.Lock()
+
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.probability = 0.0        # Smoothed speech probability
+        self.noise_db = -60.0         # Tracked noise floor
+        self.speech_db = -20.0        # Tracked speech level
+        self.pauses = deque(maxlen=50)  # This speaker's mid-turn pauses, in seconds
+        self.partial = ""
+        self.active = False           # Inside an utterance the recorder is capturing
+        self.reset()
+
+        # Totals for the saved-time report
+        self.turns = 0
+        self.waited = 0.0
+        self.saved = 0.0
+        self.early = 0
+
+    def reset(self):
+        """Start tracking a new utterance"""
+        with self.lock:
+            self.speech_seconds = 0.0
+            self.silence_seconds = 0.0
+            self.in_speech = False
+            self.committed = False
+            self.partial = ""
+
+    def start(self):
+        """The recorder started capturing an utterance"""
+        self.reset()
+        self.active = True
+
+    def stop(self):
+        """The recorder stopped (on its own or because we committed)"""
+        self.active = False
+
+    def update_partial(self, text):
+        self.partial = text or ""
+
+    def feed(self, data):
+        """Feed 16-bit mono PCM"""
+        self.pending = np.concatenate([self.pending, np.frombuffer(data, dtype=np.int16)])
+        while len(self.pending) >= VAD_FRAME:
+            frame, self.pending = self.pending[:VAD_FRAME], self.pending[VAD_FRAME:]
+            self._frame(frame)
+
+    def _frame(self, frame):
+        seconds = len(frame) / float(self.sample_rate)
+        samples = frame.astype(np.float32) / 32768.0
+        level = 10 * np.log10(float(np.dot(samples, samples)) / len(samples) + 1e-10)
+
+        if self.vad is not None:
+            voiced = self.vad.is_speech(frame.tobytes(), self.sample_rate)
+        else:
+            voiced = level > self.noise_db + 9
+        self.probability = 0.7 * self.probability + 0.3 * (1.0 if voiced else 0.0)
+
+        # Noise floor falls quickly and rises slowly; speech level follows voiced frames
+        if level < self.noise_db:
+            self.noise_db = 0.8 * self.noise_db + 0.2 * level
+        else:
+            self.noise_db = min(self.noise_db + 0.05, level)
+        if voiced:
+            self.speech_db = 0.95 * self.speech_db + 0.05 * level
+
+        with self.lock:
+            if self.probability >= 0.5:
+                if not self.in_speech and self.speech_seconds and self.silence_seconds < self.max_silence:
+                    self.pauses.append(self.silence_seconds)  # Speaker resumed: that was a hesitation
+                self.in_speech = True
+                self.speech_seconds += seconds
+                self.silence_seconds = 0.0
+                return
+
+            self.in_speech = False
+            self.silence_seconds += seconds
+            if not self.active or self.committed or self.speech_seconds < self.min_speech:
+                return
+            if self.silence_seconds < self.required_silence(level):
+                return
+            self.committed = True
+            waited = self.silence_seconds
+
+        self.turns += 1
+        self.waited += waited
+        self.saved += max(0.0, self.max_silence - waited)
+        if waited < self.max_silence:
+            self.early += 1
+        self.on_end(waited)
+
+    def required_silence(self, level):
+        """Trailing silence needed before this utterance counts as finished"""
+        verdict = completeness(self.partial, self.wake_words)
+        if verdict < 0:
+            return self.max_silence
+        if verdict > 0:
+            required = self.complete_silence
+        else:
+            # A bit longer than nearly all of this speaker's hesitations
+            typical = float(np.percentile(self.pauses, 90)) if len(self.pauses) >= 5 else self.default_pause
+            required = typical * 1.2
+
+        # Energy decay: back at the noise floor means a clean stop, lingering energy means maybe not
+        headroom = self.speech_db - self.noise_db
+        if headroom > 6:
+            if level < self.noise_db + 3:
+                required *= 0.9
+            elif level > self.noise_db + headroom / 2:
+                required *= 1.3
+        return min(self.max_silence, max(self.min_silence, required))
+
+    def summary(self):
+        if not self.turns:
+            return "no turns endpointed yet"
+        average = self.waited / self.turns
+        return (f"{self.early}/{self.turns} turns ended before the {self.max_silence:.1f}s timeout, "
+                f"avg wait {average * 1000:.0f} ms, {self.saved:.1f} s saved")
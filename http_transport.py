@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Shared HTTP transport for Ada's ElevenLabs and OpenAI calls.
+
+One pooled keep-alive httpx client serves both backends, so DNS, TCP and TLS
+are paid once per host instead of once per utterance. Connections are
+pre-warmed at startup and re-warmed after idle periods, and every new
+connection's handshake time is traced so the transport can report how much
+handshake time reuse has saved.
+
+Base URLs are plain settings, so everything can be pointed at a local HTTP
+stand-in (e.g. http://127.0.0.1:8000) for testing.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from startup_profile import startup
+
+
+ELEVENLABS_BASE_URL = "https://api.elevenlabs.io"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class _TracingTransport(httpx.HTTPTransport):
+    """httpx transport that measures connect/TLS time of every new connection"""
+
+    def __init__(self, on_request, **kwargs):
+        super().__init__(**kwargs)
+        self.on_request = on_request
+
+    def handle_request(self, request):
+        started = {}
+        handshake = []
+
+        def trace(name, info):
+            # httpcore emits connection.connect_tcp.* and connection.start_tls.* only for new connections
+            step, _, phase = name.rpartition(".")
+            if step not in ("connection.connect_tcp", "connection.start_tls"):
+                return
+            if phase == "started":
+                started[step] = time.perf_counter()
+            elif phase == "complete" and step in started:
+                handshake.append(time.perf_counter() - started.pop(step))
+
+        request.extensions = dict(request.extensions, trace=trace)
+        response = super().handle_request(request)
+        self.on_request(sum(handshake) if handshake else None, request.extensions.get("prewarm", False))
+        return response
+
+
+class HttpTransport:
+    """Pooled, pre-warmed HTTP connections with handshake accounting"""
+
+    def __init__(self, connect_timeout=3.0, read_timeout=20.0, max_connections=8,
+                 keepalive_expiry=90.0, idle_rewarm=30.0):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.idle_rewarm = idle_rewarm  # Re-warm a host after this many idle seconds
+
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.client = httpx.Client(
+            timeout=self.timeout,
+            transport=_TracingTransport(self._record_request, limits=limits, retries=1),
+        )
+
+        # Stats
+        self.lock = threading.Lock()
+        self.requests = 0           # Real requests (warm-up pings excluded)
+        self.reused = 0             # Real requests that went out on an already open connection
+        self.new_connections = 0
+        self.handshake_total = 0.0
+
+        # Hosts we keep warm: base url -> last time a request went out
+        self.warm_hosts = {}
+        self.closed = threading.Event()
+        self.keep_warm_thread = None
+
+    def _record_request(self, handshake, prewarm):
+        with self.lock:
+            if handshake is not None:
+                self.new_connections += 1
+                self.handshake_total += handshake
+            if not prewarm:
+                self.requests += 1
+                if handshake is None:
+                    self.reused += 1
+
+    def _touch(self, url):
+        base = self._base(url)
+        with self.lock:
+            if base in self.warm_hosts:
+                self.warm_hosts[base] = time.monotonic()
+
+    @staticmethod
+    def _base(url):
+        parts = urlsplit(str(url))
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def stream(self, method, url, **kwargs):
+        """Streaming request on a pooled connection (use as a context manager)"""
+        self._touch(url)
+        return self.client.stream(method, url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        self._touch(url)
+        return self.client.request(method, url, **kwargs)
+
+    def openai_client(self, api_key, base_url=None):
+        """OpenAI client that shares this transport's connection pool and timeouts"""
+        with startup.phase("openai", "import"):  # The SDK takes a while to import, so it isn't at module top
+            import openai
+        return openai.OpenAI(api_key=api_key, base_url=base_url or OPENAI_BASE_URL,
+                             http_client=self.client, timeout=self.timeout)
+
+    def prewarm(self, url, wait=False, quiet=False):
+        """Open a connection to url's host now so the first real request skips the handshake"""
+        base = self._base(url)
+        with self.lock:
+            self.warm_hosts[base] = time.monotonic()
+
+        def warm():
+            start = time.perf_counter()
+            try:
+                # Any response (even 404) leaves an open, TLS-established connection in the pool
+                self.client.head(base + "/", extensions={"prewarm": True})
+                if not quiet:
+                    print(f"Pre-warmed {base} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                print(f"Pre-warm of {base} failed: {e}")
+
+        if wait:
+            warm()
+        else:
+            threading.Thread(target=warm, daemon=True).start()
+        self._start_keep_warm()
+
+    def _start_keep_warm(self):
+        if self.keep_warm_thread is None and self.idle_rewarm:
+            self.keep_warm_thread = threading.Thread(target=self._keep_warm_worker, daemon=True)
+            self.keep_warm_thread.start()
+
+    def _keep_warm_worker(self):
+        """Re-warm hosts that have been idle long enough for their connection to be dropped"""
+        while not self.closed.wait(min(5.0, self.idle_rewarm)):
+            now = time.monotonic()
+            with self.lock:
+                idle = [base for base, last in self.warm_hosts.items() if now - last >= self.idle_rewarm]
+            for base in idle:
+                self.prewarm(base, wait=True, quiet=True)
+
+    def report(self):
+        """Connection reuse stats, including the estimated handshake time saved"""
+        with self.lock:
+            avg = self.handshake_total / self.new_connections if self.new_connections else 0.0
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused,
+                "avg_handshake_ms": avg * 1000,
+                "handshake_saved_ms": self.reused * avg * 1000,
+            }
+
+    def summary(self):
+        stats = self.report()
+        return (f"{stats['requests']} requests, {stats['new_connections']} new connections "
+                f"(avg handshake {stats['avg_handshake_ms']:.0f} ms), "
+                f"~{stats['handshake_saved_ms'] / 1000:.1f} s handshake time saved by reuse")
+
+    def close(self):
+        self.closed.set()
+        self.client.close()
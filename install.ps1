@@ -147,7 +147,7 @@ function Test-Installation {
     
     $testScript = @"
 import sys
-packages = ['torch', 'RealtimeSTT', 'openai', 'requests', 'pygame', 'numpy']
+packages = ['torch', 'RealtimeSTT', 'openai', 'httpx', 'pyaudio', 'numpy']
 failed = []
 
 for package in packages:
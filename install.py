@@ -115,8 +115,8 @@ def test_imports():
         ("torch", "PyTorch"),
         ("RealtimeSTT", "Speech recognition"),
         ("openai", "OpenAI API"),
-        ("requests", "HTTP requests"),
-        ("pygame", "Audio playback"),
+        ("httpx", "HTTP client"),
+        ("pyaudio", "Audio playback"),
         ("numpy", "Numerical computing")
     ]
     
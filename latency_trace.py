@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Per-turn latency tracing for Ada's voice pipeline.
+
+Each turn (one utterance picked up by the VAD) collects monotonic timestamps
+for the pipeline stages below. Finished turns are appended to a JSONL file
+and folded into rolling p50/p95 figures for the GUI, so a slow turn can be
+pinned on Whisper, OpenAI, ElevenLabs or the fixed post-speech delays.
+"""
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+# Pipeline stages in the order they happen
+STAGES = [
+    "vad_end",           # Recorder decided the utterance is over (after its silence timeout)
+    "transcript_ready",  # Full transcription available
+    "wake_decision",     # Wake word found (or not)
+    "llm_request",       # Chat completion request sent
+    "llm_first_token",   # First streamed token arrived
+    "llm_done",          # Full reply received
+    "tts_first_byte",    # First audio byte of the first spoken chunk
+    "playback_start",    # Audio output started
+    "playback_end",      # Last chunk finished playing
+    "listening_again",   # Post-speech delays over, ready for the next command
+]
+
+# Intervals summarized in the GUI: label -> (from stage, to stage)
+SEGMENTS = [
+    ("Whisper", "vad_end", "transcript_ready"),
+    ("LLM first token", "llm_request", "llm_first_token"),
+    ("LLM full reply", "llm_request", "llm_done"),
+    ("TTS first byte", "llm_first_token", "tts_first_byte"),
+    ("To first audio", "vad_end", "playback_start"),
+    ("Post-speech delays", "playback_end", "listening_again"),
+]
+
+DEFAULT_TRACE_PATH = os.path.join(os.path.expanduser("~"), ".ada_latency_traces.jsonl")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Turn:
+    """Timestamps for one pass through the pipeline"""
+
+    def __init__(self, tracer, turn_id, meta):
+        self.tracer = tracer
+        self.turn_id = turn_id
+        self.meta = meta
+        self.marks = {}
+        self.finished = False
+        self.lock = threading.Lock()
+
+    def mark(self, stage, timestamp=None):
+        """Record when a stage happened (time.monotonic()); the first mark of a stage wins"""
+        with self.lock:
+            if stage not in self.marks:
+                self.marks[stage] = timestamp if timestamp is not None else time.monotonic()
+
+    def note(self, **meta):
+        with self.lock:
+            self.meta.update(meta)
+
+    def finish(self, outcome=None):
+        """Close the turn and hand it to the tracer (only once); an outcome noted earlier wins"""
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+            if outcome:
+                self.meta.setdefault("outcome", outcome)
+        self.tracer.record(self)
+
+    def elapsed_ms(self, start, end):
+        if start in self.marks and end in self.marks:
+            return (self.marks[end] - self.marks[start]) * 1000
+        return None
+
+
+class LatencyTracer:
+    """Collects turns, writes them as JSONL and keeps rolling percentiles"""
+
+    def __init__(self, path=DEFAULT_TRACE_PATH, window=100, on_record=None):
+        self.path = path
+        self.on_record = on_record  # Called with each finished turn's entry
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.windows = {label: deque(maxlen=window) for label, _, _ in SEGMENTS}
+
+    def start_turn(self, **meta):
+        return Turn(self, next(self.ids), meta)
+
+    def record(self, turn):
+        origin = min(turn.marks.values()) if turn.marks else 0.0
+        entry = {
+            "turn": turn.turn_id,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            # Stage offsets in ms from the first mark of the turn
+            "stages": {stage: round((turn.marks[stage] - origin) * 1000, 1)
+                       for stage in STAGES if stage in turn.marks},
+            "segments": {},
+        }
+        entry.update(turn.meta)
+
+        with self.lock:
+            for label, start, end in SEGMENTS:
+                value = turn.elapsed_ms(start, end)
+                if value is not None:
+                    entry["segments"][label] = round(value, 1)
+                    self.windows[label].append(value)
+
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Could not write latency trace: {e}")
+
+        if self.on_record:
+            self.on_record(entry)
+
+    def summary(self):
+        """{segment label: (p50 ms, p95 ms, samples)} over the rolling window"""
+        with self.lock:
+            return {label: (percentile(list(values), 0.5), percentile(list(values), 0.95), len(values))
+                    for label, values in self.windows.items()}
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Local fast path for simple voice commands.
+
+Commands like "what time is it", "stop", "repeat that", "louder" or "clear
+the chat" don't need a language model. IntentRouter compiles every intent's
+patterns into a single regular expression, matched against the normalized
+command before anything is sent to OpenAI. A matching intent's handler runs
+locally and returns the reply as a list of short phrases, which are meant to
+be spoken from the TTS cache (see phrases(), used to pre-render them), so
+these commands answer in tens of milliseconds and keep working offline.
+Anything that doesn't match goes to the LLM as before.
+"""
+import re
+import threading
+from collections import Counter
+
+
+# Politeness around a command that shouldn't stop it from matching
+LEADING_FILLER = r"(?:(?:ok(?:ay)?|so|um|uh|hey|please|can you|could you|would you|will you|just)\s+)*"
+TRAILING_FILLER = r"(?:\s+(?:please|now|for me|thanks|thank you|ada))*"
+
+ONES = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+        "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"]
+TENS = {2: "twenty", 3: "thirty", 4: "forty", 5: "fifty"}
+
+
+def normalize(text):
+    """Lowercase words only: "What's the time, Ada?" -> "what's the time ada" """
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower().replace("’", "'")))
+
+
+def number_words(n):
+    """0-59 in words"""
+    if n < 20:
+        return ONES[n]
+    tens, ones = divmod(n, 10)
+    return TENS[tens] + (f" {ONES[ones]}" if ones else "")
+
+
+def time_phrases(now):
+    """A clock time as cacheable phrases: ["It's three", "forty two", "PM."]"""
+    hour = now.hour % 12 or 12
+    if now.minute == 0:
+        minutes = "o'clock"
+    elif now.minute < 10:
+        minutes = f"oh {ONES[now.minute]}"
+    else:
+        minutes = number_words(now.minute)
+    return [f"It's {ONES[hour]}", minutes, "AM." if now.hour < 12 else "PM."]
+
+
+def all_time_phrases():
+    """Every phrase time_phrases can produce (74 of them), for pre-rendering"""
+    phrases = [f"It's {ONES[hour]}" for hour in range(1, 13)]
+    phrases += ["o'clock"] + [f"oh {ONES[m]}" for m in range(1, 10)] + [number_words(m) for m in range(10, 60)]
+    return phrases + ["AM.", "PM."]
+
+
+class Intent:
+    """A named local command: regex patterns over the normalized text and a handler.
+
+    handler(match) returns the phrases to speak (an empty list for a silent action).
+    phrases lists the fixed replies it can give, so they can be pre-rendered.
+    """
+
+    def __init__(self, name, patterns, handler, phrases=()):
+        self.name = name
+        self.patterns = list(patterns)
+        self.handler = handler
+        self.phrases = list(phrases)
+
+
+class IntentRouter:
+    """Matches a command against every registered intent with one compiled regex"""
+
+    def __init__(self, intents=()):
+        self.intents = []
+        self.pattern = None
+        self.lock = threading.Lock()
+        self.handled = Counter()
+        self.passed = 0
+        for intent in intents:
+            self.add(intent)
+
+    def add(self, intent):
+        self.intents.append(intent)
+        self.pattern = self._compile()
+
+    def _compile(self):
+        # One named group per intent, so a single scan picks the intent
+        alternatives = [f"(?P<i{index}>{'|'.join(f'(?:{p})' for p in intent.patterns)})"
+                        for index, intent in enumerate(self.intents)]
+        return re.compile(f"{LEADING_FILLER}(?:{'|'.join(alternatives)}){TRAILING_FILLER}")
+
+    def match(self, text, count=True):
+        """(intent, match) for a command the whole of which is a local intent, else None.
+
+        count=False leaves the statistics alone (for checks on partial transcripts).
+        """
+        if self.pattern is None:
+            return None
+        match = self.pattern.fullmatch(normalize(text))
+        intent = self.intents[int(match.lastgroup[1:])] if match else None
+        if count:
+            with self.lock:
+                if intent:
+                    self.handled[intent.name] += 1
+                else:
+                    self.passed += 1
+        return (intent, match) if intent else None
+
+    def phrases(self):
+        """Every fixed reply phrase, for TTS cache warm-up"""
+        return [phrase for intent in self.intents for phrase in intent.phrases]
+
+    def summary(self):
+        with self.lock:
+            total = sum(self.handled.values())
+            detail = ", ".join(f"{name} {count}" for name, count in self.handled.most_common())
+            return f"{total} command(s) answered locally{f' ({detail})' if detail else ''}, {self.passed} sent to the LLM"
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Local semantic memory for Ada.
+
+Past exchanges from the conversation log are embedded on the CPU and stored
+in an append-only vector file (float32, or int8 with a per-row scale) that is
+memory-mapped at startup. A lookup embeds the user's message and scores it
+against the stored rows with NumPy; past a few thousand rows an inverted-file
+index (k-means centroids, built in the background) restricts the scan to the
+closest clusters, which keeps a lookup around a millisecond at 100k turns.
+
+Embeddings come from sentence-transformers (all-MiniLM-L6-v2) when it is
+installed, otherwise from a feature-hashing embedder that needs no model.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from model_registry import models
+
+# Only checked here: importing it pulls in torch, so that happens in the background loader
+HAVE_SENTENCE_TRANSFORMERS = importlib.util.find_spec("sentence_transformers") is not None
+
+
+DEFAULT_MEMORY_DIR = os.path.join(os.path.expanduser("~"), ".ada_memory")
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and word pairs - crude, but instant and dependency-free"""
+
+    name = "hashing-384"
+    dim = 384
+
+    def load(self):
+        return self
+
+    def is_ready(self):
+        return True
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9']+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dim] += 1.0 if value & (1 << 63) else -1.0
+        return normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """Small sentence-transformers model on the CPU, loaded once per process in the background"""
+
+    dim = 384
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self.name = model_name
+        self.future = models.load_async(("embedder", model_name), self._load)
+
+    def _load(self):
+        import sentence_transformers
+        return sentence_transformers.SentenceTransformer(self.model_name, device="cpu")
+
+    def load(self):
+        self.future.result()
+        return self
+
+    def is_ready(self):
+        return self.future.done() and self.future.exception() is None
+
+    def embed(self, texts):
+        model = self.future.result()
+        return normalize(np.asarray(model.encode(list(texts), batch_size=32), dtype=np.float32))
+
+
+def create_embedder():
+    if HAVE_SENTENCE_TRANSFORMERS:
+        return SentenceTransformerEmbedder()
+    print("sentence-transformers not installed - semantic memory uses hashed word features")
+    return HashingEmbedder()
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class MemoryIndex:
+    """Append-only, memory-mapped embedding matrix of past exchanges with NumPy top-k search"""
+
+    def __init__(self, directory=DEFAULT_MEMORY_DIR, embedder=None, dtype="float32",
+                 ivf_threshold=5000, probe_clusters=8):
+        self.embedder = embedder or create_embedder()
+        self.dtype = dtype                    # "float32" or "int8" (4x smaller, slightly less precise)
+        self.ivf_threshold = ivf_threshold    # Build the cluster index once this many rows exist
+        self.probe_clusters = probe_clusters  # Clusters scanned per lookup
+        self.dim = self.embedder.dim
+        self.lock = threading.Lock()
+        self.syncing = threading.Lock()
+
+        # One set of files per embedder/precision, since their vectors aren't comparable
+        self.directory = os.path.join(directory, f"{self.embedder.name}-{dtype}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.bin")
+        self.scales_path = os.path.join(self.directory, "scales.f32")
+        self.texts_path = os.path.join(self.directory, "texts.jsonl")
+        self.offsets_path = os.path.join(self.directory, "offsets.u64")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.clustered_path = os.path.join(self.directory, "clustered.bin")
+        self.ivf_path = os.path.join(self.directory, "ivf.npz")
+
+        self.meta = {"store_last_id": 0}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                self.meta.update(json.load(f))
+
+        self._open()
+        self.ivf = None  # centroids, row order and bounds per cluster, clustered rows, rows covered
+        self.building = False
+        self._load_ivf()
+        self.searches = 0
+        self.search_seconds = 0.0
+        self._maybe_build_ivf()
+
+    def _row_bytes(self):
+        return self.dim * (1 if self.dtype == "int8" else 4)
+
+    def _open(self):
+        """Memory-map the stored rows, trimming any partially written tail"""
+        def size(path):
+            return os.path.getsize(path) if os.path.exists(path) else 0
+
+        count = min(size(self.vectors_path) // self._row_bytes(), size(self.offsets_path) // 8)
+        if self.dtype == "int8":
+            count = min(count, size(self.scales_path) // 4)
+        for path, row_size in ((self.vectors_path, self._row_bytes()), (self.offsets_path, 8), (self.scales_path, 4)):
+            if os.path.exists(path) and size(path) != count * row_size:
+                with open(path, "r+b") as f:
+                    f.truncate(count * row_size)
+
+        self.count = count
+        self.mapped_count = count
+        storage = np.int8 if self.dtype == "int8" else np.float32
+        self.matrix = np.memmap(self.vectors_path, dtype=storage, mode="r", shape=(count, self.dim)) if count else None
+        self.scales = np.fromfile(self.scales_path, dtype=np.float32) if self.dtype == "int8" and count else None
+        self.offsets = np.fromfile(self.offsets_path, dtype=np.uint64) if count else np.zeros(0, dtype=np.uint64)
+        self.tail = []  # float32 rows appended since the files were mapped
+
+    def __len__(self):
+        return self.count
+
+    def sync(self, store, batch=256):
+        """Embed and add every exchange logged in store since the last sync (call from a background thread)"""
+        if not self.syncing.acquire(blocking=False):
+            return 0  # Another sync is already catching up
+        added = 0
+        try:
+            store.flush()
+            while True:
+                exchanges, last_id = store.exchanges_after(self.meta["store_last_id"], batch)
+                if exchanges:
+                    self._add(exchanges)
+                    added += len(exchanges)
+                if last_id == self.meta["store_last_id"]:
+                    break
+                self.meta["store_last_id"] = last_id
+                self._save_meta()
+        except Exception as e:
+            print(f"Semantic memory sync failed: {e}")
+        finally:
+            self.syncing.release()
+        if added:
+            self._maybe_build_ivf()
+        return added
+
+    def _add(self, exchanges):
+        vectors = self.embedder.embed([f"{user}\n{reply}" for _, _, user, reply in exchanges])
+        with open(self.texts_path, "ab") as texts:
+            offsets = []
+            for row_id, created, user, reply in exchanges:
+                offsets.append(texts.tell())
+                texts.write(json.dumps({"id": row_id, "created": created, "user": user, "reply": reply}).encode("utf-8") + b"\n")
+
+        if self.dtype == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+            stored = np.round(vectors / scales[:, None]).astype(np.int8)
+            with open(self.scales_path, "ab") as f:
+                f.write(scales.astype(np.float32).tobytes())
+        else:
+            stored = vectors
+        with open(self.vectors_path, "ab") as f:
+            f.write(stored.tobytes())
+        with open(self.offsets_path, "ab") as f:
+            f.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+
+        with self.lock:
+            self.tail.extend(vectors)
+            self.offsets = np.concatenate([self.offsets, np.asarray(offsets, dtype=np.uint64)])
+            self.count += len(exchanges)
+
+    def _save_meta(self):
+        temp = self.meta_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(dict(self.meta, embedder=self.embedder.name, dim=self.dim, dtype=self.dtype), f)
+        os.replace(temp, self.meta_path)
+
+    def _rows(self, start, end):
+        """float32 vectors for rows start..end-1 (mapped rows and the unmapped tail)"""
+        parts = []
+        if start < self.mapped_count:
+            rows = self.matrix[start:min(end, self.mapped_count)].astype(np.float32)
+            if self.dtype == "int8":
+                rows *= self.scales[start:min(end, self.mapped_count), None]
+            parts.append(rows)
+        if end > self.mapped_count and self.tail:
+            parts.append(np.asarray(self.tail[max(0, start - self.mapped_count):end - self.mapped_count], dtype=np.float32))
+        return np.concatenate(parts) if parts else np.zeros((0, self.dim), dtype=np.float32)
+
+    def _scan(self, query, start, end):
+        """Brute-force scores for rows start..end-1, in chunks so int8 rows are never all converted at once"""
+        return np.concatenate([self._rows(i, min(i + 8192, end)) @ query for i in range(start, end, 8192)] or
+                              [np.zeros(0, dtype=np.float32)])
+
+    def search(self, text, k=3, min_score=0.35):
+        """Up to k past exchanges most similar to text, best first, as dicts with a score.
+
+        Returns nothing (instead of waiting) while the embedding model is still loading.
+        """
+        if not self.count or not self.embedder.is_ready():
+            return []
+        started = time.perf_counter()
+        query = self.embedder.embed([text])[0]
+
+        with self.lock:
+            if self.ivf is not None:
+                # Score only the closest clusters (contiguous in the clustered copy) plus rows added since
+                ivf = self.ivf
+                nearest = np.argsort(-(ivf["centroids"] @ query))[:self.probe_clusters]
+                ids, scores = [], []
+                for cluster in nearest:
+                    start, end = ivf["bounds"][cluster], ivf["bounds"][cluster + 1]
+                    rows = ivf["matrix"][start:end].astype(np.float32)
+                    if ivf["scales"] is not None:
+                        rows *= ivf["scales"][start:end, None]
+                    ids.append(ivf["order"][start:end])
+                    scores.append(rows @ query)
+                ids.append(np.arange(ivf["count"], self.count))
+                scores.append(self._scan(query, ivf["count"], self.count))
+                ids, scores = np.concatenate(ids), np.concatenate(scores)
+            else:
+                scores = self._scan(query, 0, self.count)
+                ids = np.arange(len(scores))
+
+        top = np.argpartition(-scores, k)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        results = []
+        with open(self.texts_path, "rb") as texts:
+            for position in top:
+                if scores[position] < min_score:
+                    break
+                texts.seek(int(self.offsets[ids[position]]))
+                entry = json.loads(texts.readline())
+                entry["score"] = float(scores[position])
+                results.append(entry)
+
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - started
+        return results
+
+    def _load_ivf(self):
+        """The cluster index saved by the last build, if it still matches the stored rows"""
+        if not os.path.exists(self.ivf_path):
+            return
+        try:
+            with np.load(self.ivf_path) as saved:
+                ivf = {name: saved[name] for name in saved.files}
+            count = int(ivf["count"])
+            storage = np.int8 if self.dtype == "int8" else np.float32
+            if count > self.count or os.path.getsize(self.clustered_path) != count * self._row_bytes():
+                return
+            ivf["count"] = count
+            ivf["matrix"] = np.memmap(self.clustered_path, dtype=storage, mode="r", shape=(count, self.dim))
+            ivf.setdefault("scales", None)
+            self.ivf = ivf
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Rebuilding the semantic memory index: {e}")
+
+    def _maybe_build_ivf(self):
+        """(Re)build the cluster index in the background once enough rows are unindexed"""
+        covered = self.ivf["count"] if self.ivf else 0
+        if self.building or self.count < self.ivf_threshold or self.count - covered < max(self.ivf_threshold, covered // 4):
+            return
+        self.building = True
+        threading.Thread(target=self._build_ivf, daemon=True).start()
+
+    def _build_ivf(self, iterations=8, sample_size=20000):
+        try:
+            self._cluster(iterations, sample_size)
+        except Exception as e:
+            print(f"Could not build the semantic memory index: {e}")
+        finally:
+            self.building = False
+
+    def _cluster(self, iterations, sample_size):
+        with self.lock:
+            count = self.count
+            # Re-map so the rows added since startup are covered by the memmap too
+            storage = np.int8 if self.dtype == "int8" else np.float32
+            matrix = np.memmap(self.vectors_path, dtype=storage, mode="r", shape=(count, self.dim))
+            scales = np.fromfile(self.scales_path, dtype=np.float32)[:count] if self.dtype == "int8" else None
+
+        def rows(indices):
+            block = matrix[indices].astype(np.float32)
+            return block * scales[indices, None] if scales is not None else block
+
+        # Spherical k-means on a sample, about sqrt(n) clusters
+        clusters = max(16, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample = normalize(rows(np.sort(rng.choice(count, min(count, sample_size), replace=False))))
+        centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(clusters):
+                members = sample[assignment == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = normalize(centroids)
+
+        assignment = np.concatenate([np.argmax(rows(slice(i, i + 8192)) @ centroids.T, axis=1)
+                                     for i in range(0, count, 8192)])
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(clusters + 1))
+
+        # A copy of the rows in cluster order, so a probe reads contiguous slices
+        temp = self.clustered_path + ".tmp"
+        with open(temp, "wb") as f:
+            for i in range(0, count, 8192):
+                f.write(np.ascontiguousarray(matrix[order[i:i + 8192]]).tobytes())
+        ivf = {"centroids": centroids, "order": order, "bounds": bounds, "count": count}
+        if scales is not None:
+            ivf["scales"] = scales[order]
+        with open(self.ivf_path + ".tmp", "wb") as f:
+            np.savez(f, **ivf)
+        clustered = np.memmap(temp, dtype=storage, mode="r", shape=(count, self.dim))
+
+        with self.lock:
+            os.replace(temp, self.clustered_path)
+            os.replace(self.ivf_path + ".tmp", self.ivf_path)
+            ivf["matrix"] = clustered
+            ivf.setdefault("scales", None)
+            self.ivf = ivf
+            self.tail = self.tail[count - self.mapped_count:]
+            self.matrix, self.mapped_count = matrix, count
+            if scales is not None:
+                self.scales = scales
+        print(f"Semantic memory: indexed {count} exchanges in {clusters} clusters")
+
+    def summary(self):
+        average = self.search_seconds / self.searches * 1000 if self.searches else 0
+        return f"{self.count} exchanges indexed, {self.searches} lookups (avg {average:.1f} ms)"
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide registry of loaded models.
+
+Loading Whisper weights takes seconds and hundreds of MB, so every model is
+loaded at most once per process, in a background thread, no matter how many
+app instances or model switches ask for it.
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+
+class ModelRegistry:
+    """Load each model key once in the background and hand out the shared instance"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.futures = {}     # key -> Future resolving to the loaded model
+        self.load_times = {}  # key -> seconds the load took
+
+    def load_async(self, key, loader, on_done=None):
+        """Start loading key with loader() unless it is already loaded or loading.
+
+        Returns a Future; on_done(future) is called once the model is ready (or failed).
+        """
+        with self.lock:
+            future = self.futures.get(key)
+            if future is None:
+                future = Future()
+                self.futures[key] = future
+                threading.Thread(target=self._load, args=(key, loader, future), daemon=True).start()
+        if on_done:
+            future.add_done_callback(on_done)
+        return future
+
+    def get(self, key, loader, timeout=None):
+        """Blocking version of load_async"""
+        return self.load_async(key, loader).result(timeout)
+
+    def is_loaded(self, key):
+        with self.lock:
+            future = self.futures.get(key)
+        return future is not None and future.done() and future.exception() is None
+
+    def _load(self, key, loader, future):
+        start = time.perf_counter()
+        try:
+            model = loader()
+        except BaseException as e:
+            # Forget failed loads so a later request can retry
+            with self.lock:
+                self.futures.pop(key, None)
+            future.set_exception(e)
+            return
+        self.load_times[key] = time.perf_counter() - start
+        print(f"Loaded model {key} in {self.load_times[key]:.1f}s")
+        future.set_result(model)
+
+    def unload(self, key):
+        """Drop a model so its memory can be reclaimed once nothing else holds it"""
+        with self.lock:
+            self.futures.pop(key, None)
+
+
+# Shared by every app instance in this process
+models = ModelRegistry()
@@ -1,6 +1,11 @@
 import subprocess
 import sys
 import os
+import shutil
+
+# Repo-root modules shared with the other Ada versions
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_SCRIPTS = {"install.py", "voiceonly.py", "ada_engine.py"}
 
 def install_requirements():
     print("Installing Python dependencies...")
@@ -18,6 +23,11 @@ def create_app_directory():
             if file != "install.py":
                 os.rename(file, os.path.join("ada_mouse_only", file))
 
+    print("Copying shared Ada modules...")
+    for file in os.listdir(REPO_ROOT):
+        if file.endswith(".py") and file not in ROOT_SCRIPTS:
+            shutil.copy(os.path.join(REPO_ROOT, file), os.path.join("ada_mouse_only", file))
+
 def main():
     install_requirements()
     create_app_directory()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling-window transcription for push-to-talk.
+
+Audio is written into a preallocated int16 NumPy buffer while the user is
+still talking. A background thread transcribes committed windows (cut at a
+quiet point so words aren't split) and stitches the text together, so when
+recording stops only the last uncommitted stretch still needs transcribing.
+"""
+import threading
+import numpy as np
+
+
+class RollingTranscriber:
+    """Incrementally transcribe a growing recording.
+
+    transcribe(audio, prompt) takes float32 audio in [-1, 1] plus the text so far
+    (useful as Whisper's initial_prompt) and returns the text for that window.
+    """
+
+    def __init__(self, transcribe, sample_rate=16000, min_window=2.0, max_window=8.0,
+                 search_seconds=0.8, silence_rms=200, initial_seconds=30):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.min_window = int(min_window * sample_rate)        # Don't commit windows shorter than this
+        self.max_window = int(max_window * sample_rate)        # Force a cut if no pause shows up
+        self.search = int(search_seconds * sample_rate)        # Look for a pause this far back from the end
+        self.frame = int(0.03 * sample_rate)                   # 30 ms energy frames
+        self.silence_rms = silence_rms                         # int16 RMS below which a frame counts as a pause
+
+        self.buffer = np.zeros(int(initial_seconds * sample_rate), dtype=np.int16)
+        self.length = 0       # Samples written
+        self.committed = 0    # Samples already transcribed
+        self.texts = []
+
+        self.cond = threading.Condition()
+        self.recording = True
+        self.worker = threading.Thread(target=self._worker, daemon=True)
+
+    def start(self):
+        self.worker.start()
+        return self
+
+    def write(self, data):
+        """Append raw int16 PCM bytes from the microphone"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        with self.cond:
+            end = self.length + len(samples)
+            if end > len(self.buffer):
+                # Grow geometrically so long recordings stay amortized O(1) per chunk
+                grown = np.zeros(max(end, len(self.buffer) * 2), dtype=np.int16)
+                grown[:self.length] = self.buffer[:self.length]
+                self.buffer = grown
+            self.buffer[self.length:end] = samples
+            self.length = end
+            self.cond.notify_all()
+
+    def duration(self):
+        return self.length / float(self.sample_rate)
+
+    def _find_cut(self):
+        """Pick a commit point in the pending audio, or None if it's too early (lock held)"""
+        pending = self.length - self.committed
+        if pending < self.min_window + self.search:
+            return None
+
+        # Quietest 30 ms frame in the search region just before the end
+        start = self.length - self.search
+        region = self.buffer[start:self.length].astype(np.float32)
+        frames = len(region) // self.frame
+        energy = np.sqrt(np.mean(region[:frames * self.frame].reshape(frames, self.frame) ** 2, axis=1))
+        quietest = int(np.argmin(energy))
+        if energy[quietest] > self.silence_rms and pending < self.max_window:
+            return None  # Mid-word; wait for a pause
+        return start + quietest * self.frame + self.frame // 2
+
+    def _transcribe_range(self, start, end):
+        """Transcribe buffer[start:end] (lock not held)"""
+        with self.cond:
+            audio = self.buffer[start:end].copy()
+            prompt = " ".join(self.texts)
+        if len(audio) == 0:
+            return
+        # Skip windows that are all silence - Whisper tends to hallucinate text on them
+        if np.sqrt(np.mean(audio.astype(np.float32) ** 2)) < self.silence_rms / 2:
+            return
+        text = self.transcribe(audio.astype(np.float32) / 32768.0, prompt).strip()
+        if text:
+            with self.cond:
+                self.texts.append(text)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: not self.recording or self._find_cut() is not None)
+                if not self.recording:
+                    return
+                start, cut = self.committed, self._find_cut()
+            try:
+                self._transcribe_range(start, cut)
+            except Exception as e:
+                print(f"Rolling transcription failed: {e}")
+            with self.cond:
+                self.committed = cut
+
+    def finish(self):
+        """Stop recording, transcribe the last uncommitted stretch and return the full text"""
+        with self.cond:
+            self.recording = False
+            self.cond.notify_all()
+        if self.worker.is_alive():
+            self.worker.join()  # Let the window in progress land first
+        self._transcribe_range(self.committed, self.length)
+        with self.cond:
+            self.committed = self.length
+            return " ".join(self.texts).strip()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Speculative replies for Ada.
+
+The ChatGPT request normally starts only once the final transcript exists.
+A Speculator starts it earlier, from the realtime partial transcript, as
+soon as the command after the wake word has stopped changing. The reply
+streams into a buffer without being spoken. When the final transcript
+arrives, a close enough match takes the reply over (buffered chunks first,
+then the rest as it streams); anything else cancels it, closing the stream,
+and the normal request runs. A speculative request never touches the
+conversation history: its prompt is built with speculative=True and only a
+committed reply is recorded, by the normal path.
+"""
+import difflib
+import re
+import threading
+import time
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def similarity(a, b):
+    """Word-level similarity of two commands, 0-1"""
+    return difflib.SequenceMatcher(None, words(a), words(b)).ratio()
+
+
+class SpeculativeReply:
+    """One reply streaming in the background from a partial transcript"""
+
+    def __init__(self, command, messages, memories, revision, stream, run=None):
+        self.command = command
+        self.messages = messages
+        self.memories = memories
+        self.revision = revision     # Context revision the prompt was built against
+        self.stream = stream
+        self.run = run               # run(fn) on a worker; a new thread if None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.chunks = []             # Buffered until a sink is attached
+        self.sink = None
+        self.on_first_token = None
+        self.started_at = time.monotonic()
+        self.first_token_at = None
+        self.text = ""
+        self.error = None
+        self.saved = 0.0             # Seconds this head start saved, set when committed
+
+    def start(self):
+        if self.run is not None:
+            self.run(self._run)
+        else:
+            threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.text = self.stream(self.messages, self._chunk, self._first_token, self.cancelled)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def _first_token(self):
+        with self.lock:
+            self.first_token_at = time.monotonic()
+            callback = self.on_first_token
+        if callback:
+            callback()
+
+    def _chunk(self, chunk):
+        with self.lock:
+            if self.sink is None:
+                self.chunks.append(chunk)
+                return
+        self.sink(chunk)
+
+    def attach(self, sink, on_first_token=None, cancelled=None):
+        """Speak the reply: replay buffered chunks into sink, forward the rest, return the full text.
+
+        Setting the cancelled Event stops the stream, as for a normal reply.
+        """
+        with self.lock:
+            for chunk in self.chunks:
+                sink(chunk)
+            self.chunks = []
+            self.sink = sink
+            self.on_first_token = on_first_token
+        while not self.done.wait(0.05):
+            if cancelled is not None and cancelled.is_set():
+                self.cancel()
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class Speculator:
+    """Starts replies from stable partial commands and hands one over (or cancels it) at the final transcript.
+
+    prepare(command) returns (messages, memories) without changing any state,
+    stream(messages, on_chunk, on_first_token, cancelled) returns the reply text,
+    revision() identifies the conversation state a prompt was built from and
+    count_tokens(text) estimates token costs for the report. run(fn), if
+    given, runs the streams on existing workers instead of new threads.
+    """
+
+    def __init__(self, prepare, stream, revision, count_tokens, min_similarity=0.9, max_per_utterance=2, min_words=2,
+                 run=None):
+        self.prepare = prepare
+        self.stream = stream
+        self.run = run
+        self.revision = revision
+        self.count_tokens = count_tokens
+        self.min_similarity = min_similarity        # Final vs speculated command to commit
+        self.max_per_utterance = max_per_utterance  # Re-speculations when the partial keeps changing
+        self.min_words = min_words
+        self.lock = threading.Lock()
+        self.current = None
+        self.last_partial = None
+        self.started_this_utterance = 0
+
+        # Counters
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+        self.wasted_tokens = 0
+
+    def observe(self, command):
+        """A partial transcript's command; speculate once it has been the same twice in a row"""
+        key = " ".join(words(command))
+        with self.lock:
+            stable = key == self.last_partial
+            self.last_partial = key
+            if not stable or len(key.split()) < self.min_words:
+                return
+            if self.current is not None:
+                if " ".join(words(self.current.command)) == key:
+                    return  # Already speculating on this
+                self._discard()  # The user kept talking: this one is stale
+            if self.started_this_utterance >= self.max_per_utterance:
+                return
+            self.started_this_utterance += 1
+            self.started += 1
+
+        messages, memories = self.prepare(command)
+        reply = SpeculativeReply(command, messages, memories, self.revision(), self.stream, self.run).start()
+        with self.lock:
+            if self.last_partial == key and self.current is None:
+                self.current = reply
+                return
+        reply.cancel()  # Superseded while the prompt was being built
+
+    def take(self, command):
+        """The SpeculativeReply to commit for the final command, or None (anything outstanding is cancelled)"""
+        now = time.monotonic()
+        with self.lock:
+            reply, self.current = self.current, None
+            self.last_partial = None
+            self.started_this_utterance = 0
+            if reply is None:
+                return None
+            if (reply.error is None and reply.revision == self.revision()
+                    and similarity(reply.command, command) >= self.min_similarity):
+                # Head start, but no more than the first-token latency it actually hid
+                head_start = now - reply.started_at
+                if reply.first_token_at is not None:
+                    head_start = min(head_start, reply.first_token_at - reply.started_at)
+                reply.saved = head_start
+                self.hits += 1
+                self.saved += head_start
+                return reply
+            self._discard(reply)
+        return None
+
+    def failed(self, reply):
+        """A reply returned by take() failed while it was being spoken: count it as a miss, not a hit"""
+        with self.lock:
+            self.hits -= 1
+            self.saved -= reply.saved
+            self._discard(reply)
+
+    def reset(self):
+        """A new utterance started (or the last one didn't go to the LLM): drop any speculation"""
+        with self.lock:
+            self._discard()
+            self.last_partial = None
+            self.started_this_utterance = 0
+
+    def _discard(self, reply=None):
+        """Cancel a speculation and count what it cost (lock held)"""
+        reply = reply or self.current
+        if reply is None:
+            return
+        if reply is self.current:
+            self.current = None
+        reply.cancel()
+        self.misses += 1
+        prompt = sum(self.count_tokens(message["content"]) for message in reply.messages)
+        self.wasted_tokens += prompt + self.count_tokens(reply.text or "".join(reply.chunks))
+
+    def summary(self):
+        with self.lock:
+            decided = self.hits + self.misses
+            rate = self.hits / decided if decided else 0.0
+            average = self.saved / self.hits * 1000 if self.hits else 0
+            return (f"{self.started} speculative requests, {self.hits} hits ({rate:.0%}), "
+                    f"avg {average:.0f} ms saved per hit, ~{self.wasted_tokens} tokens spent on misses")
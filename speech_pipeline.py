@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming speech pipeline for Ada.
+
+Cuts a streamed ChatGPT reply into sentence/clause sized chunks and speaks them
+in order while the rest of the reply is still being generated, so the first
+audio plays after the first sentence instead of after the whole reply.
+"""
+import re
+import threading
+import queue
+
+from audio_stream import PCMBuffer
+
+
+# Words that end in a period but do not end a sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no"}
+
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s')
+CLAUSE_END = re.compile(r'[,;:—–]\s')
+
+
+class SentenceChunker:
+    """Accumulate streamed tokens and hand back speakable chunks"""
+
+    def __init__(self, min_chars=8, first_clause_chars=40, clause_chars=100, max_chars=250):
+        self.min_chars = min_chars                    # Don't speak tiny fragments like "Oh."
+        self.first_clause_chars = first_clause_chars  # Cut the first chunk early at a clause for fast start
+        self.clause_chars = clause_chars              # Cut long sentences at a clause boundary
+        self.max_chars = max_chars                    # Hard cut at a word boundary for run-on text
+        self.buffer = ""
+        self.chunks_emitted = 0
+
+    def feed(self, token):
+        """Add a streamed token and return the list of chunks that are now complete"""
+        self.buffer += token
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            chunk = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+                self.chunks_emitted += 1
+        return chunks
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        chunk = self.buffer.strip()
+        self.buffer = ""
+        if chunk:
+            self.chunks_emitted += 1
+            return [chunk]
+        return []
+
+    def _find_cut(self):
+        """Find the end index of the next complete chunk in the buffer, or None"""
+        for match in SENTENCE_END.finditer(self.buffer):
+            end = match.end()
+            if end < self.min_chars or self._is_abbreviation(match.start()):
+                continue
+            return end
+
+        clause_limit = self.first_clause_chars if self.chunks_emitted == 0 else self.clause_chars
+        if len(self.buffer) >= clause_limit:
+            for match in CLAUSE_END.finditer(self.buffer):
+                if match.end() >= self.min_chars:
+                    return match.end()
+
+        if len(self.buffer) >= self.max_chars:
+            space = self.buffer.rfind(" ", 0, self.max_chars)
+            return space + 1 if space > 0 else self.max_chars
+
+        return None
+
+    def _is_abbreviation(self, index):
+        """Check whether the punctuation at index closes an abbreviation like 'Dr.'"""
+        if self.buffer[index] != ".":
+            return False
+        word = self.buffer[:index].rsplit(None, 1)[-1] if self.buffer[:index].strip() else ""
+        return word.lower() in ABBREVIATIONS or len(word) == 1
+
+
+class SpeechPipeline:
+    """Synthesize text chunks in the background and play them back in order.
+
+    synthesize(text, buffer) streams the audio for one chunk into a PCMBuffer
+    and closes it, and play(buffer, on_start) blocks until that buffer has
+    finished playing. Each buffer is handed to the player before its download
+    starts, so playback begins on the first bytes, and while chunk N is playing
+    chunk N+1 is already downloading.
+    """
+
+    _END = object()
+
+    def __init__(self, synthesize, play, on_start=None, on_finish=None, on_complete=None, prefetch=2):
+        self.synthesize = synthesize
+        self.play = play
+        self.on_start = on_start        # First audio started
+        self.on_finish = on_finish      # Last audio finished (only if anything played)
+        self.on_complete = on_complete  # Pipeline done, whether or not anything played
+
+        self.text_queue = queue.Queue()
+        self.audio_queue = queue.Queue(maxsize=prefetch)
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.started_playing = False
+
+        self.synth_thread = threading.Thread(target=self._synth_worker, daemon=True)
+        self.play_thread = threading.Thread(target=self._play_worker, daemon=True)
+
+    def start(self):
+        self.synth_thread.start()
+        self.play_thread.start()
+        return self
+
+    def say(self, text):
+        """Queue a chunk of text to be spoken after everything queued before it"""
+        if text and text.strip():
+            self.text_queue.put(text.strip())
+
+    def close(self):
+        """Signal that no more chunks are coming"""
+        self.text_queue.put(self._END)
+
+    def cancel(self):
+        """Drop everything that hasn't been played yet"""
+        self.cancelled.set()
+        self.close()
+
+    def wait(self, timeout=None):
+        """Block until the last chunk has played"""
+        return self.finished.wait(timeout)
+
+    def _synth_worker(self):
+        while True:
+            text = self.text_queue.get()
+            if text is self._END or self.cancelled.is_set():
+                break
+            buffer = PCMBuffer()
+            self.audio_queue.put(buffer)
+            try:
+                self.synthesize(text, buffer)
+            except Exception as e:
+                print(f"Speech synthesis failed for chunk: {e}")
+            finally:
+                buffer.close()
+        self.audio_queue.put(self._END)
+
+    def _play_worker(self):
+        try:
+            while True:
+                audio = self.audio_queue.get()
+                if audio is self._END:
+                    break
+                if self.cancelled.is_set():
+                    continue
+                try:
+                    self.play(audio, self._notify_start)
+                except Exception as e:
+                    print(f"Playback failed for chunk: {e}")
+        finally:
+            if self.started_playing and self.on_finish:
+                self.on_finish()
+            if self.on_complete:
+                self.on_complete()
+            self.finished.set()
+
+    def _notify_start(self):
+        """Called by the player when audio output actually begins"""
+        if not self.started_playing:
+            self.started_playing = True
+            if self.on_start:
+                self.on_start()
+
+
+def stream_chat_reply(openai_client, messages, on_chunk, chunker=None, on_first_token=None, cancelled=None,
+                      **create_kwargs):
+    """Stream a chat completion, handing each finished chunk to on_chunk.
+
+    Returns the full reply text once the stream has ended. Setting the cancelled
+    Event closes the stream early and returns what had arrived so far.
+    """
+    chunker = chunker or SentenceChunker()
+    parts = []
+
+    stream = openai_client.chat.completions.create(messages=messages, stream=True, **create_kwargs)
+    for event in stream:
+        if cancelled is not None and cancelled.is_set():
+            stream.close()  # Drops the connection instead of reading the rest of the reply
+            return "".join(parts).strip()
+        if not event.choices:
+            continue
+        token = event.choices[0].delta.content
+        if not token:
+            continue
+        if not parts and on_first_token:
+            on_first_token()
+        parts.append(token)
+        for chunk in chunker.feed(token):
+            on_chunk(chunk)
+
+    for chunk in chunker.flush():
+        on_chunk(chunk)
+
+    return "".join(parts).strip()
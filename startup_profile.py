@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Startup timing for Ada.
+
+Heavy subsystems (torch, RealtimeSTT, the OpenAI SDK, the audio mixer) are
+imported and initialized on background threads after the window is up, so
+the interesting numbers are how long each phase took and when the app
+became usable. Code wraps each phase:
+
+    with startup.phase("RealtimeSTT", "import"):
+        from RealtimeSTT import AudioToTextRecorder
+
+and marks milestones ("window shown", "ready"). report() prints the phases
+grouped by kind (import, model load, mixer init, client init...), so
+regressions in time-to-ready show up from one run to the next.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Durations of named startup phases and times of milestones, since the profile was created"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.phases = []      # (kind, name, start offset, seconds, thread name)
+        self.milestones = {}  # name -> offset in seconds
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name, kind):
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            ended = time.monotonic()
+            with self.lock:
+                self.phases.append((kind, name, began - self.started, ended - began,
+                                    threading.current_thread().name))
+
+    def mark(self, milestone):
+        """Record the first time milestone was reached"""
+        with self.lock:
+            self.milestones.setdefault(milestone, time.monotonic() - self.started)
+
+    def by_kind(self):
+        """Total seconds per kind of phase (phases on different threads overlap)"""
+        with self.lock:
+            totals = {}
+            for kind, _, _, seconds, _ in self.phases:
+                totals[kind] = totals.get(kind, 0.0) + seconds
+            return totals
+
+    def as_dict(self):
+        with self.lock:
+            phases = [{"kind": kind, "name": name, "start": round(start, 3), "seconds": round(seconds, 3),
+                       "thread": thread} for kind, name, start, seconds, thread in self.phases]
+            milestones = {name: round(offset, 3) for name, offset in self.milestones.items()}
+        return {"phases": phases, "milestones": milestones,
+                "by_kind": {kind: round(seconds, 3) for kind, seconds in self.by_kind().items()}}
+
+    def report(self):
+        """Print the phases in the order they started, then the totals per kind (once per process)"""
+        with self.lock:
+            if self.reported:
+                return
+            self.reported = True
+            phases = sorted(self.phases, key=lambda phase: phase[2])
+            milestones = sorted(self.milestones.items(), key=lambda item: item[1])
+        print("Startup profile:")
+        for kind, name, start, seconds, thread in phases:
+            print(f"  {start:6.2f}s +{seconds:6.2f}s  {kind:<11s} {name}  [{thread}]")
+        for name, offset in milestones:
+            print(f"  {offset:6.2f}s           {name}")
+        totals = ", ".join(f"{kind} {seconds:.2f}s" for kind, seconds in sorted(self.by_kind().items()))
+        print(f"  By kind: {totals}")
+
+
+# Started when first imported, so import it before anything heavy
+startup = StartupProfile()
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from asr_scheduler import BatchScheduler
+
+
+class BlockingBackend:
+    """Transcribes every clip as "ok", holding each batch until release is set"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def transcribe_batch(self, audios, prompts):
+        self.started.set()
+        self.release.wait(5)
+        return ["ok"] * len(audios)
+
+
+def clip(seconds=1.0):
+    return np.zeros(int(16000 * seconds), dtype=np.float32)
+
+
+def test_cancelled_request_does_not_stop_the_worker():
+    backend = BlockingBackend()
+    scheduler = BatchScheduler(backend, max_wait_ms=0)
+    try:
+        first = scheduler.submit(clip())
+        assert backend.started.wait(2)
+        queued = scheduler.submit(clip())
+        assert queued.cancel()  # Still queued behind the running batch
+        backend.release.set()
+        assert first.result(2) == "ok"
+        assert scheduler.transcribe(clip(), timeout=2) == "ok"
+        assert all(thread.is_alive() for thread in scheduler.threads)
+        assert scheduler.cancelled == 1
+    finally:
+        backend.release.set()
+        scheduler.close()
+
+
+def test_request_cancelled_right_after_submit():
+    backend = BlockingBackend()
+    backend.release.set()
+    scheduler = BatchScheduler(backend)
+    try:
+        scheduler.submit(clip()).cancel()
+        assert scheduler.transcribe(clip(), timeout=2) == "ok"
+        assert all(thread.is_alive() for thread in scheduler.threads)
+    finally:
+        scheduler.close()
+
+
+def test_short_batch_fails_every_request_without_a_result():
+    class Short:
+        def transcribe_batch(self, audios, prompts):
+            return ["x"] * (len(audios) - 1)
+
+    scheduler = BatchScheduler(Short())
+    try:
+        future = scheduler.submit(clip())
+        try:
+            future.result(2)
+        except RuntimeError as e:
+            assert "0 transcripts for 1" in str(e)
+        else:
+            raise AssertionError("expected the request to fail")
+        assert scheduler.threads[0].is_alive()
+    finally:
+        scheduler.close()
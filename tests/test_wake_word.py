@@ -0,0 +1,41 @@
+import pytest
+
+from wake_word import WakeWordGate
+
+
+@pytest.fixture
+def gate():
+    return WakeWordGate(["hey ada", "ada", "hello ada"])
+
+
+@pytest.mark.parametrize("text", [
+    "good idea",
+    "audio is broken",
+    "a day at the beach",
+    "hey eddie",
+    "hey add a note",
+    "hey adam",
+    "data is useful",
+    "canada is big",
+])
+def test_everyday_speech_does_not_fire(gate, text):
+    assert gate.find(text) is None
+
+
+@pytest.mark.parametrize("text, wake_word, command", [
+    ("aida", "ada", ""),
+    ("ida turn it up", "ada", "turn it up"),
+    ("hey data what time is it", "hey ada", "what time is it"),
+    ("hello data", "hello ada", ""),
+    ("heyada tell me a joke", "hey ada", "tell me a joke"),
+])
+def test_near_misses_fire(gate, text, wake_word, command):
+    match = gate.find(text)
+    assert match is not None
+    assert match[:2] == (wake_word, command)
+    assert match[2] >= gate.threshold
+
+
+def test_exact_phrase_counts_anywhere(gate):
+    assert gate.find("so I told them, hey ada, what's the weather") == ("hey ada", "what's the weather", 1.0)
+    assert gate.find("so I told them that aida was here") is None  # Near misses only near the start
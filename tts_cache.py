@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of synthesized speech for Ada.
+
+Audio is keyed by everything that changes how it sounds (voice, model, voice
+settings and normalized text), kept in a byte-bounded in-memory LRU and in a
+byte-bounded on-disk store. Repeated phrases play straight from the cache
+without an ElevenLabs round trip or API quota.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ada_tts_cache")
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) store of PCM audio with size-bounded eviction"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, memory_budget=16 * 1024 * 1024,
+                 disk_budget=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> bytes, most recently used last
+        self.memory_bytes = 0
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @staticmethod
+    def normalize(text):
+        """Collapse whitespace and unicode variants; case and punctuation are kept since they change prosody"""
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def key(self, voice_id, model_id, voice_settings, text):
+        """Content address for one synthesized phrase"""
+        material = json.dumps([voice_id, model_id, voice_settings or {}, self.normalize(text)],
+                              sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def contains(self, key):
+        with self.lock:
+            if key in self.memory:
+                return True
+        return bool(self.cache_dir) and os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Return cached audio bytes or None"""
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self.lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+            return data
+
+    def put(self, key, data):
+        """Store audio in both tiers"""
+        if not data:
+            return
+        data = bytes(data)
+        with self.lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def _remember(self, key, data):
+        """Insert into the memory LRU and evict down to budget (lock held)"""
+        if len(data) > self.memory_budget:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old)
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.memory_budget:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for disk eviction
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.cache_dir or len(data) > self.disk_budget:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Readers never see a half-written file
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+            return
+        with self.lock:
+            self.disk_bytes += len(data)
+            over_budget = self.disk_bytes > self.disk_budget
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_entries(self):
+        """(path, size, last_used) for every cached file"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pcm"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier is back under budget"""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self.lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+        with self.lock:
+            self.disk_bytes = total
+
+    def warm_up(self, phrases, key_for, render):
+        """Pre-render phrases that aren't cached yet in a background thread.
+
+        key_for(text) returns the cache key and render(text) returns audio bytes or None.
+        """
+        def worker():
+            rendered = 0
+            for text in phrases:
+                key = key_for(text)
+                if self.contains(key):
+                    continue
+                data = render(text)
+                if data:
+                    self.put(key, data)
+                    rendered += 1
+            if rendered:
+                print(f"TTS cache warm-up rendered {rendered} phrase(s)")
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self.lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_bytes": self.memory_bytes,
+                "disk_bytes": self.disk_bytes,
+            }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['memory_hits']} memory hits, {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+                f"{stats['evictions']} evictions")
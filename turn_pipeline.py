@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Staged, ordered turn processing for Ada.
+
+Every turn used to get fresh daemon threads - one for the reply, two more
+for its speech - that raced each other over the conversation and the
+speaking flags. A TurnPipeline instead runs fixed stages on one asyncio
+loop, connected by bounded queues:
+
+    submit() -> respond -> synthesize -> play
+
+- respond runs turn handlers (local intents, ChatGPT replies) one at a time,
+  in the order the turns were heard, so only one turn ever touches the
+  conversation at a time;
+- synthesize turns each chunk of speech into PCM, a couple of chunks ahead
+  of playback;
+- play plays the buffers in order and runs the start/finish callbacks, so
+  only one thread ever changes the speaking state.
+
+Full queues push back on whoever feeds them: a reply streaming faster than
+it can be spoken waits in say(). The blocking work runs on a fixed set of
+daemon threads, so the thread count stays the same however many turns come
+in. A new turn supersedes older ones by default: their cancelled Event is
+set, which streaming replies check between tokens, and anything of theirs
+still waiting to be spoken is dropped.
+"""
+import asyncio
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+
+from audio_stream import PCMBuffer
+
+
+_END = object()
+
+
+class DaemonExecutor(Executor):
+    """A fixed pool of daemon threads (ThreadPoolExecutor's would hold up exit on a stuck request)"""
+
+    def __init__(self, workers, name):
+        self.jobs = queue.Queue()
+        self.threads = [threading.Thread(target=self._work, name=f"{name}-{index}", daemon=True)
+                        for index in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.jobs.put((future, fn, args, kwargs))
+        return future
+
+    def _work(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                break
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True, **kwargs):
+        for _ in self.threads:
+            self.jobs.put(None)
+
+
+class TurnJob:
+    """One turn's handler call, plus the speech it queued"""
+
+    def __init__(self, handler, args, turn=None):
+        self.handler = handler
+        self.args = args
+        self.turn = turn
+        self.cancelled = threading.Event()  # Checked by streaming replies between tokens
+        self.done = threading.Event()
+        self.speeches = []
+
+    def cancel(self, outcome="superseded"):
+        if self.cancelled.is_set() or (self.done.is_set() and all(speech.finished.is_set() for speech in self.speeches)):
+            return False
+        self.cancelled.set()
+        if self.turn:
+            self.turn.note(outcome=outcome)
+        for speech in list(self.speeches):
+            speech.cancel()
+        return True
+
+
+class Speech:
+    """Speaks text through the shared synthesize and play stages.
+
+    A drop-in for SpeechPipeline (same constructor arguments and methods),
+    except that the stages and their threads belong to the TurnPipeline.
+    """
+
+    def __init__(self, stages, synthesize, play, on_start=None, on_finish=None, on_complete=None):
+        self.stages = stages
+        self.synthesize = synthesize
+        self.play = play
+        self.on_start = on_start        # First audio started
+        self.on_finish = on_finish      # Last audio finished (only if anything played)
+        self.on_complete = on_complete  # Done, whether or not anything played
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.closed = False
+        self.close_lock = threading.Lock()
+        self.started_playing = False
+
+    def start(self):
+        return self
+
+    def say(self, text):
+        """Queue a chunk of text; blocks while the synthesize stage is full"""
+        if text and text.strip() and not self.cancelled.is_set():
+            self.stages.put_text(self, text.strip())
+
+    def close(self):
+        """Signal that no more chunks are coming"""
+        with self.close_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.stages.put_text(self, _END)
+
+    def cancel(self):
+        """Drop everything that hasn't been played yet, including what is playing now"""
+        self.cancelled.set()
+        self.stages.stop_if_playing(self)
+        self.close()
+
+    def wait(self, timeout=None):
+        """Block until the last chunk has played"""
+        return self.finished.wait(timeout)
+
+    def _synthesize(self, text, buffer):
+        if not self.cancelled.is_set():
+            self.synthesize(text, buffer)
+
+    def _play(self, buffer):
+        if not self.cancelled.is_set():
+            self.play(buffer, self._notify_start)
+
+    def _notify_start(self):
+        if not self.started_playing:
+            self.started_playing = True
+            if self.on_start:
+                self.on_start()
+
+    def _complete(self):
+        try:
+            if self.started_playing and self.on_finish:
+                self.on_finish()
+            if self.on_complete:
+                self.on_complete()
+        finally:
+            self.finished.set()
+
+
+class TurnPipeline:
+    """Runs turns through the respond, synthesize and play stages in order.
+
+    stop_playback() must interrupt the play() call of whatever is playing.
+    """
+
+    def __init__(self, stop_playback, max_pending_turns=4, max_pending_text=8, prefetch=2, background_workers=3):
+        self.stop_playback = stop_playback
+        self.max_pending_turns = max_pending_turns  # Turns waiting for the respond stage
+        self.max_pending_text = max_pending_text    # Text chunks waiting for synthesis
+        self.prefetch = prefetch                    # Synthesized chunks waiting for playback
+        self.background_workers = background_workers
+        self.lock = threading.Lock()
+        self.loop = None
+        self.loop_thread = None
+        self.pending = deque()   # Jobs submitted and not yet done, oldest first
+        self.current = None      # Job running on the respond stage
+        self.playing = None      # Speech whose chunk is playing
+
+        # Counters
+        self.submitted = 0
+        self.superseded = 0
+        self.peak_pending = 0
+
+    def start(self):
+        """Start the stage loop and its worker threads. Returns self"""
+        self.respond_executor = DaemonExecutor(1, "ada-respond")
+        self.synth_executor = DaemonExecutor(1, "ada-synthesize")
+        self.play_executor = DaemonExecutor(1, "ada-play")
+        self.background_executor = DaemonExecutor(self.background_workers, "ada-background")
+
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self._setup())
+            ready.set()
+            self.loop.run_forever()
+
+        self.loop_thread = threading.Thread(target=run, name="ada-stages", daemon=True)
+        self.loop_thread.start()
+        ready.wait()
+        return self
+
+    async def _setup(self):
+        # Queues are created on the loop that uses them
+        self.jobs = asyncio.Queue(maxsize=self.max_pending_turns)
+        self.texts = asyncio.Queue(maxsize=self.max_pending_text)
+        self.audio = asyncio.Queue(maxsize=self.prefetch)
+        self.tasks = [self.loop.create_task(stage())
+                      for stage in (self._respond_stage, self._synthesize_stage, self._play_stage)]
+
+    def submit(self, handler, *args, turn=None, supersede=True):
+        """Run handler(*args) on the respond stage after the turns before it.
+
+        With supersede, turns still being answered or spoken are cancelled first.
+        Blocks while max_pending_turns are already waiting. Returns the TurnJob.
+        """
+        job = TurnJob(handler, args, turn)
+        if supersede:
+            self.cancel_all()
+        with self.lock:
+            self.pending.append(job)
+            self.submitted += 1
+            self.peak_pending = max(self.peak_pending, len(self.pending))
+        asyncio.run_coroutine_threadsafe(self.jobs.put(job), self.loop).result()
+        return job
+
+    def cancel_all(self, outcome="superseded"):
+        """Cancel every turn that is queued, being answered or being spoken (except the caller's own)"""
+        with self.lock:
+            jobs = list(self.pending)
+        for job in jobs:
+            if job is self.own_job():
+                continue
+            if job.cancel(outcome) and outcome == "superseded":
+                self.superseded += 1
+
+    def speech(self, synthesize, play, on_start=None, on_finish=None, on_complete=None):
+        """A Speech for the job on the respond stage (if any), so cancelling the job silences it"""
+        speech = Speech(self, synthesize, play, on_start, on_finish, on_complete)
+        job = self.own_job()
+        if job is not None:
+            job.speeches.append(speech)
+            if job.cancelled.is_set():
+                speech.cancelled.set()
+        return speech
+
+    def own_job(self):
+        """The job whose handler is calling, or None outside the respond stage"""
+        if threading.current_thread() in self.respond_executor.threads:
+            return self.current
+        return None
+
+    def background(self, fn, *args):
+        """Run fn(*args) on the fixed background workers (memory sync, speculative replies...)"""
+        def report(future):
+            if future.exception() is not None:
+                print(f"Background task {getattr(fn, '__name__', fn)} failed: {future.exception()}")
+        self.background_executor.submit(fn, *args).add_done_callback(report)
+
+    def put_text(self, speech, text):
+        if threading.current_thread() is self.loop_thread:
+            raise RuntimeError("put_text would block the stage loop")
+        asyncio.run_coroutine_threadsafe(self.texts.put((speech, text)), self.loop).result()
+
+    def stop_if_playing(self, speech):
+        if self.playing is speech:
+            self.stop_playback()
+
+    async def _respond_stage(self):
+        while True:
+            job = await self.jobs.get()
+            self.current = job
+            try:
+                if not job.cancelled.is_set():
+                    await self.loop.run_in_executor(self.respond_executor, self._run, job)
+                elif job.turn:
+                    job.turn.finish()  # Superseded before it started
+            finally:
+                self.current = None
+                job.done.set()
+                self._forget(job)
+
+    def _run(self, job):
+        try:
+            job.handler(*job.args)
+        except Exception as e:
+            print(f"Turn handler {getattr(job.handler, '__name__', job.handler)} failed: {e}")
+
+    def _forget(self, job):
+        """Drop a job from pending once it is answered and all its speech has played"""
+        if job.done.is_set() and all(speech.finished.is_set() for speech in job.speeches):
+            with self.lock:
+                if job in self.pending:
+                    self.pending.remove(job)
+
+    async def _synthesize_stage(self):
+        while True:
+            speech, text = await self.texts.get()
+            if text is _END:
+                await self.audio.put((speech, _END))
+                continue
+            if speech.cancelled.is_set():
+                continue
+            buffer = PCMBuffer()
+            await self.audio.put((speech, buffer))  # Waits while prefetch chunks are ahead of playback
+            try:
+                await self.loop.run_in_executor(self.synth_executor, speech._synthesize, text, buffer)
+            except Exception as e:
+                print(f"Speech synthesis failed for chunk: {e}")
+            finally:
+                buffer.close()
+
+    async def _play_stage(self):
+        while True:
+            speech, buffer = await self.audio.get()
+            if buffer is _END:
+                try:
+                    await self.loop.run_in_executor(self.play_executor, speech._complete)
+                except Exception as e:
+                    print(f"Speech completion callback failed: {e}")
+                with self.lock:
+                    jobs = [job for job in self.pending if speech in job.speeches]
+                for job in jobs:
+                    self._forget(job)
+                continue
+            if speech.cancelled.is_set():
+                continue
+            self.playing = speech
+            try:
+                await self.loop.run_in_executor(self.play_executor, speech._play, buffer)
+            except Exception as e:
+                print(f"Playback failed for chunk: {e}")
+            finally:
+                self.playing = None
+
+    def threads(self):
+        """Worker threads owned by the pipeline (constant once started)"""
+        executors = (self.respond_executor, self.synth_executor, self.play_executor, self.background_executor)
+        return 1 + sum(len(executor.threads) for executor in executors)
+
+    def close(self):
+        if self.loop is None:
+            return
+        self.cancel_all("closed")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        for executor in (self.respond_executor, self.synth_executor, self.play_executor, self.background_executor):
+            executor.shutdown()
+
+    def summary(self):
+        with self.lock:
+            return (f"{self.submitted} turn(s), {self.superseded} superseded, "
+                    f"at most {self.peak_pending} in flight, {self.threads() if self.loop else 0} worker threads")
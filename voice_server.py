@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-client voice server for Ada.
+
+One process serves many rooms: each client streams its microphone audio over
+TCP (or a Unix socket) and gets Ada's spoken replies back on the same
+connection. Every session keeps its own conversation, wake-word state,
+endpointing and voice, while all of them share one loaded ASR model (through
+the model registry, with utterances from different rooms transcribed in
+batches by asr_scheduler), one pooled HTTP transport for OpenAI and
+ElevenLabs and one TTS cache.
+
+Frames in both directions are a 1-byte kind, a 4-byte big-endian length and
+the payload:
+
+    client -> server   b"H"  hello, JSON: {"session", "wake_words", "voice_id",
+                                            "voice_settings", "system_prompt"} (all optional)
+                       b"A"  16 kHz mono 16-bit PCM from the microphone
+                       b"B"  bye
+    server -> client   b"E"  event, JSON with a "type": ready, transcript, reply, turn or error
+                       b"A"  22.05 kHz mono 16-bit PCM of Ada's voice
+
+    python voice_server.py --port 8765 --asr faster-whisper:small:int8
+    python voice_server.py --unix /tmp/ada.sock
+
+Use benchmarks/load_test.py to find how many sessions a box can serve.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from asr_backends import DEFAULT_ASR_CONFIG, SAMPLE_RATE, create_backend, parse_backend_spec
+from asr_scheduler import BatchScheduler
+from audio_stream import PCM_OUTPUT_FORMAT
+from context_window import ConversationContext, summarize_conversation
+from endpointing import Endpointer
+from http_transport import HttpTransport, ELEVENLABS_BASE_URL, OPENAI_BASE_URL
+from latency_trace import LatencyTracer
+from model_registry import models
+from speech_pipeline import stream_chat_reply
+from tts_cache import TTSCache, DEFAULT_CACHE_DIR
+from turn_pipeline import DaemonExecutor
+from wake_word import WakeWordGate
+
+
+HEADER = struct.Struct(">cI")
+MAX_FRAME = 4 * 1024 * 1024
+
+DEFAULT_WAKE_WORDS = ["hey ada", "ada", "hello ada"]
+DEFAULT_VOICE_ID = "ThT5KcBeYPX3keUQqHPh"  # Dorothy
+DEFAULT_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.5, "style": 0.0, "use_speaker_boost": True}
+DEFAULT_SYSTEM_PROMPT = ("You are Ada, a warm and curious AI companion. "
+                         "Keep responses conversational and relatively brief since this is a voice conversation.")
+WAKE_WORD_PROMPT = "I heard the wake word. What can I help you with?"
+
+
+def encode_frame(kind, payload):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader):
+    """(kind, payload) of the next frame, or (None, None) once the peer has gone"""
+    try:
+        kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        if length > MAX_FRAME:
+            raise ValueError(f"frame of {length} bytes")
+        return kind, await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, None
+
+
+def event_frame(**event):
+    return encode_frame(b"E", json.dumps(event).encode("utf-8"))
+
+
+class Session:
+    """One connected client: its conversation, wake-word state, endpointing and voice"""
+
+    def __init__(self, server, session_id, hello, send, preroll_seconds=0.3, max_utterance_seconds=30.0):
+        self.server = server
+        self.id = session_id
+        self.send = send   # send(frame) from any thread
+        self.wake_words = [w.lower() for w in hello.get("wake_words") or DEFAULT_WAKE_WORDS]
+        self.voice_id = hello.get("voice_id") or DEFAULT_VOICE_ID
+        self.voice_settings = hello.get("voice_settings") or DEFAULT_VOICE_SETTINGS
+        self.wake_gate = WakeWordGate(self.wake_words)
+        self.context = ConversationContext(hello.get("system_prompt") or DEFAULT_SYSTEM_PROMPT,
+                                           max_prompt_tokens=server.max_prompt_tokens,
+                                           summarize=server.summarize_history)
+
+        # Utterance segmentation: the endpointer decides when a turn is over, we keep its audio
+        self.endpointer = Endpointer(self._on_end, wake_words=self.wake_words)
+        self.endpointer.start()
+        self.preroll = deque(maxlen=max(1, int(preroll_seconds * SAMPLE_RATE / 512)))
+        self.utterance = []
+        self.utterance_samples = 0
+        self.max_utterance = int(max_utterance_seconds * SAMPLE_RATE)
+        self.utterances = asyncio.Queue()  # Answered in order by run()
+        self.turns = 0
+        self.closed = threading.Event()  # Stops the LLM and TTS streams this session started
+
+    def feed(self, pcm):
+        """Microphone audio from the client (event loop thread)"""
+        self.endpointer.feed(pcm)
+        if self.endpointer.speech_seconds > 0:
+            if not self.utterance:
+                self.utterance.extend(self.preroll)  # Keep the onset the VAD needed to notice
+                self.utterance_samples = sum(len(chunk) for chunk in self.preroll) // 2
+                self.preroll.clear()
+            self.utterance.append(pcm)
+            self.utterance_samples += len(pcm) // 2
+            if self.utterance_samples >= self.max_utterance:
+                self._on_end(0.0)
+            elif (self.endpointer.speech_seconds < self.endpointer.min_speech
+                  and self.endpointer.silence_seconds > self.endpointer.max_silence):
+                self._restart()  # A click or a cough, not speech
+        else:
+            self.preroll.append(pcm)
+
+    def _on_end(self, waited):
+        audio = b"".join(self.utterance)
+        self._restart()
+        if audio:
+            self.utterances.put_nowait((audio, time.monotonic() - waited))
+
+    def _restart(self):
+        self.utterance = []
+        self.utterance_samples = 0
+        self.endpointer.start()
+
+    def event(self, **event):
+        self.send(event_frame(**event))
+
+    async def run(self):
+        """Answer this session's utterances one at a time, in order"""
+        while True:
+            audio, ended_at = await self.utterances.get()
+            try:
+                await self.respond(audio, ended_at)
+            except Exception as e:
+                self.event(type="error", message=str(e))
+
+    async def respond(self, pcm, ended_at):
+        loop = asyncio.get_running_loop()
+        server = self.server
+        turn = server.tracer.start_turn(session=self.id)
+        turn.mark("vad_end", ended_at)
+        try:
+            audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+            # Batched with other sessions; a hang-up cancels only this request, not the scheduler
+            text = await asyncio.wrap_future(server.asr_scheduler.submit(audio))
+            turn.mark("transcript_ready")
+            match = self.wake_gate.find(text) if text else None
+            turn.mark("wake_decision")
+            self.event(type="transcript", text=text, wake=bool(match))
+            if not match:
+                turn.finish("no_wake_word")
+                return
+
+            self.turns += 1
+            command = match[1]
+            if not command or len(command) <= 2:
+                turn.note(outcome="wake_prompt")
+                await self.speak([WAKE_WORD_PROMPT], turn)
+                turn.finish()
+                return
+
+            # The reply streams on an I/O worker while finished sentences are spoken here, in order
+            chunks = asyncio.Queue()
+            messages = self.context.build(command)
+            turn.note(prompt_tokens=self.context.last_prompt_tokens)
+
+            def on_chunk(chunk):
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+            def stream():
+                turn.mark("llm_request")
+                try:
+                    return server.stream_reply(messages, on_chunk, lambda: turn.mark("llm_first_token"),
+                                               self.closed)
+                finally:
+                    turn.mark("llm_done")
+                    loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+            reply = loop.run_in_executor(server.io_executor, stream)
+            await self.speak_queue(chunks, turn)
+            text = await reply
+
+            self.context.add_exchange(command, text)
+            self.event(type="reply", text=text)
+            turn.finish("replied" if "playback_start" in turn.marks else "silent")
+        except Exception:
+            turn.note(outcome="error")
+            raise
+        finally:
+            turn.finish()  # No-op if an outcome already finished it
+
+    async def speak(self, phrases, turn):
+        chunks = asyncio.Queue()
+        for phrase in phrases + [None]:
+            chunks.put_nowait(phrase)
+        await self.speak_queue(chunks, turn)
+
+    async def speak_queue(self, chunks, turn):
+        """Synthesize each queued text chunk and send its audio, until None"""
+        loop = asyncio.get_running_loop()
+
+        def send_audio(data):
+            if "playback_start" not in turn.marks:
+                turn.mark("tts_first_byte")
+                turn.mark("playback_start")  # For the server, "playing" is handing the audio to the client
+            self.send(encode_frame(b"A", data))
+
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            if self.closed.is_set():
+                continue  # Nobody to send it to; drain the queue so the reply's end is still seen
+            await loop.run_in_executor(self.server.io_executor, self.server.synthesize,
+                                       chunk, self.voice_id, self.voice_settings, send_audio, self.closed)
+        turn.mark("playback_end")
+
+    def close(self):
+        self.closed.set()
+        self.endpointer.stop()
+
+
+class VoiceServer:
+    """Serves voice sessions over TCP or a Unix socket with one shared ASR model and shared transports"""
+
+    def __init__(self, asr_config=None, host="127.0.0.1", port=8765, unix_path=None, asr_workers=1,
+                 asr_max_batch=8, asr_max_wait_ms=30, io_workers=32,
+                 openai_base_url=OPENAI_BASE_URL, elevenlabs_base_url=ELEVENLABS_BASE_URL,
+                 openai_api_key=None, elevenlabs_api_key=None, tts_model_id="eleven_monolingual_v1",
+                 tts_cache_dir=DEFAULT_CACHE_DIR, tts_memory_budget=64 * 1024 * 1024, max_prompt_tokens=1800):
+        self.asr_config = dict(DEFAULT_ASR_CONFIG, **(asr_config or {}))
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.asr_workers = asr_workers          # Batches transcribed at once on the shared model
+        self.asr_max_batch = asr_max_batch      # Utterances per batch
+        self.asr_max_wait_ms = asr_max_wait_ms  # How long a ready utterance may wait for others (busy times only)
+        self.io_workers = io_workers    # Concurrent LLM / TTS requests across all sessions
+        self.openai_base_url = openai_base_url
+        self.elevenlabs_base_url = elevenlabs_base_url
+        self.openai_api_key = openai_api_key or os.environ.get("OPENAI_API_KEY", "Add your openai api key here")
+        self.elevenlabs_api_key = (elevenlabs_api_key or
+                                   os.environ.get("ELEVENLABS_API_KEY", "Add your elevenlabs api key here"))
+        self.tts_model_id = tts_model_id
+        self.tts_cache_dir = tts_cache_dir
+        self.tts_memory_budget = tts_memory_budget
+        self.max_prompt_tokens = max_prompt_tokens
+
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.asr_scheduler = None  # Created by load(), with the transports and the TTS cache
+        self.transport = None
+        self.tts_cache = None
+        self.tracer = LatencyTracer(path=None, on_record=self.on_turn_traced)
+        self.loop = None
+        self.server = None
+        self.lock = threading.Lock()
+
+        # Counters
+        self.connections = 0
+
+    def load(self):
+        """Load the shared ASR model and open the shared transports (slow). Returns self"""
+        if self.asr_config["backend"] == "whisper":
+            self.asr_workers = 1  # PyTorch Whisper isn't safe to call from several threads
+        else:
+            self.asr_config["num_workers"] = self.asr_workers
+        backend = create_backend(self.asr_config)
+        self.asr = models.get(backend.key(), backend.load)
+        print(f"ASR: {self.asr.describe()}, batches of up to {self.asr_max_batch}, {self.asr_workers} at a time")
+
+        self.asr_scheduler = BatchScheduler(self.asr, max_batch=self.asr_max_batch, max_wait_ms=self.asr_max_wait_ms,
+                                            workers=self.asr_workers)
+        self.io_executor = DaemonExecutor(self.io_workers, "ada-io")
+        self.transport = HttpTransport(max_connections=self.io_workers)
+        self.openai_client = self.transport.openai_client(api_key=self.openai_api_key, base_url=self.openai_base_url)
+        self.transport.prewarm(self.openai_base_url)
+        self.transport.prewarm(self.elevenlabs_base_url)
+        self.tts_cache = TTSCache(self.tts_cache_dir, memory_budget=self.tts_memory_budget)
+        return self
+
+    def stream_reply(self, messages, on_chunk, on_first_token=None, cancelled=None):
+        return stream_chat_reply(self.openai_client, messages, on_chunk, on_first_token=on_first_token,
+                                 cancelled=cancelled, model="gpt-3.5-turbo", max_tokens=500, temperature=0.7)
+
+    def summarize_history(self, previous_summary, messages):
+        return summarize_conversation(self.openai_client, previous_summary, messages)
+
+    def synthesize(self, text, voice_id, voice_settings, on_audio, cancelled=None):
+        """Stream the PCM for text to on_audio(bytes), from the shared cache if possible.
+
+        Setting the cancelled Event drops the download (and caches nothing).
+        """
+        key = self.tts_cache.key(voice_id, self.tts_model_id, voice_settings, text)
+        cached = self.tts_cache.get(key)
+        if cached is not None:
+            on_audio(cached)
+            return
+
+        url = f"{self.elevenlabs_base_url}/v1/text-to-speech/{voice_id}/stream"
+        headers = {"Content-Type": "application/json", "xi-api-key": self.elevenlabs_api_key}
+        data = {"text": text, "model_id": self.tts_model_id, "voice_settings": voice_settings}
+        audio = bytearray()
+        with self.transport.stream("POST", url, params={"output_format": PCM_OUTPUT_FORMAT},
+                                   json=data, headers=headers) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"TTS failed: {response.status_code}")
+            for chunk in response.iter_bytes(chunk_size=4096):
+                if cancelled is not None and cancelled.is_set():
+                    return
+                audio.extend(chunk)
+                on_audio(chunk)
+        self.tts_cache.put(key, bytes(audio))
+
+    def on_turn_traced(self, entry):
+        session = self.sessions.get(entry.get("session"))
+        if session:
+            session.event(type="turn", **entry)
+
+    async def handle(self, reader, writer):
+        """One client connection"""
+        loop = asyncio.get_running_loop()
+        try:
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                writer.close()  # Gone before saying hello
+                return
+            hello = json.loads(payload or b"{}") if kind == b"H" else None
+            if not isinstance(hello, dict):
+                raise ValueError("expected a hello frame with a JSON object")
+        except ValueError as e:
+            self.reject(writer, f"Bad hello: {e}")
+            return
+        session_id = str(hello.get("session") or next(self.ids))
+
+        def send(frame):
+            # Replies are produced on worker threads; the socket belongs to the loop
+            loop.call_soon_threadsafe(writer.write, frame)
+
+        session = Session(self, session_id, hello, send)
+        with self.lock:
+            taken = session_id in self.sessions
+            if not taken:
+                self.sessions[session_id] = session
+                self.connections += 1
+        if taken:
+            session.close()
+            self.reject(writer, f"Session {session_id} is already connected")
+            return
+        session.event(type="ready", session=session_id)
+        task = asyncio.ensure_future(session.run())
+        try:
+            while True:
+                try:
+                    kind, payload = await read_frame(reader)
+                except ValueError as e:
+                    writer.write(event_frame(type="error", message=f"Bad frame: {e}"))
+                    break
+                if kind is None or kind == b"B":
+                    break
+                if kind == b"A":
+                    session.feed(payload)
+                    await writer.drain()
+        finally:
+            task.cancel()
+            session.close()
+            with self.lock:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+    @staticmethod
+    def reject(writer, message):
+        """Tell a client why it is being turned away, then hang up"""
+        print(f"Rejected a client: {message}")
+        writer.write(event_frame(type="error", message=message))
+        writer.close()
+
+    async def serve(self, ready=None):
+        self.loop = asyncio.get_running_loop()
+        if self.unix_path:
+            self.server = await asyncio.start_unix_server(self.handle, path=self.unix_path)
+            where = self.unix_path
+        else:
+            self.server = await asyncio.start_server(self.handle, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+            where = f"{self.host}:{self.port}"
+        print(f"Ada voice server listening on {where}")
+        if ready:
+            ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # close()
+
+    def start(self):
+        """Serve from a background thread (tests, the load generator). Returns self once listening"""
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(self.serve(ready)), daemon=True).start()
+        ready.wait()
+        return self
+
+    def close(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+        print(f"Voice server: {self.summary()}")
+        if self.asr_scheduler is not None:
+            self.asr_scheduler.close()
+            print(f"ASR batching: {self.asr_scheduler.summary()}")
+        if self.transport is not None:
+            print(f"Connection reuse: {self.transport.summary()}")
+            self.transport.close()
+        if self.tts_cache is not None:
+            print(f"TTS cache: {self.tts_cache.summary()}")
+
+    def summary(self):
+        with self.lock:
+            return f"{self.connections} session(s) served, {len(self.sessions)} connected, sharing one ASR model"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Ada to many voice clients from one process.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--asr", default="faster-whisper:base:int8", help="backend:model[:compute_type[:threads]]")
+    parser.add_argument("--asr-workers", type=int, default=1, help="Batches transcribed at once on the shared model")
+    parser.add_argument("--asr-max-batch", type=int, default=8, help="Utterances transcribed together")
+    parser.add_argument("--asr-max-wait-ms", type=float, default=30,
+                        help="Longest a ready utterance waits for others when the server is busy")
+    parser.add_argument("--io-workers", type=int, default=32, help="Concurrent LLM/TTS requests")
+    parser.add_argument("--openai-base-url", default=OPENAI_BASE_URL)
+    parser.add_argument("--elevenlabs-base-url", default=ELEVENLABS_BASE_URL)
+    args = parser.parse_args()
+
+    server = VoiceServer(parse_backend_spec(args.asr), host=args.host, port=args.port, unix_path=args.unix,
+                         asr_workers=args.asr_workers, asr_max_batch=args.asr_max_batch,
+                         asr_max_wait_ms=args.asr_max_wait_ms, io_workers=args.io_workers,
+                         openai_base_url=args.openai_base_url, elevenlabs_base_url=args.elevenlabs_base_url)
+    server.load()
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
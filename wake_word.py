@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Cheap wake-word stage for Ada.
+
+Scores partial transcripts (RealtimeSTT's fast realtime model) against the
+configured wake phrases with fuzzy matching, so near misses like "aida" or
+"hey data" still count while everyday words like "idea" or "audio" don't.
+Full transcription and the ChatGPT call only run for utterances where this
+gate fired.
+"""
+import re
+import threading
+
+
+WORD = re.compile(r"[a-z0-9']+")
+VOWELS = re.compile(r"[aeiouy]")
+
+# How the transcriber mishears each wake-phrase word. Only these count as sound-alikes:
+# a generic sounds-like rule also matches everyday words ("idea", "audio", "eddie")
+SOUND_ALIKES = {
+    "ada": ("aida", "ayda", "adah", "ida", "ada's", "aida's"),
+    "hey": ("hay", "hei", "hi"),
+    "hello": ("hallo", "hullo"),
+}
+
+
+def similarity(a, b):
+    """1 - normalized Levenshtein distance"""
+    if a == b:
+        return 1.0
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return 1.0 - previous[-1] / float(max(len(a), len(b)))
+
+
+def word_score(heard, expected, in_context, sound_alikes=SOUND_ALIKES):
+    """How well one heard word matches one wake-phrase word.
+
+    in_context is True when the word is part of a multi-word phrase. The other
+    words then make one looser match safe: a consonant run into the word
+    ("data" for "ada"), keeping its vowels and at most one other letter change.
+    """
+    if heard == expected:
+        return 1.0
+    if heard in sound_alikes.get(expected, ()):
+        return 0.9
+    if not in_context or VOWELS.match(heard) or len(heard) < 2:
+        return 0.0
+    rest = heard[1:]
+    if VOWELS.findall(rest) == VOWELS.findall(expected) and similarity(rest, expected) >= 1.0 - 1.0 / len(expected):
+        return 0.8
+    return 0.0
+
+
+class WakeWordGate:
+    """Fuzzy wake-phrase matcher that is fed partial transcripts while the user is speaking"""
+
+    def __init__(self, wake_words, threshold=0.8, fuzzy_window=3, sound_alikes=SOUND_ALIKES):
+        # Longest phrases first so "hey ada" wins over "ada"
+        self.wake_words = sorted(wake_words, key=lambda w: -len(w.split()))
+        self.sound_alikes = sound_alikes  # Word -> mishearings accepted for it
+        self.threshold = threshold        # Minimum similarity for a near miss
+        self.fuzzy_window = fuzzy_window  # Near misses only count within the first N words
+        self.fired = threading.Event()
+        self.lock = threading.Lock()
+
+        # Stats
+        self.passed = 0
+        self.skipped = 0
+
+    def find(self, text):
+        """Find a wake phrase in text.
+
+        Returns (wake_word, command_text, score) or None. Exact matches count
+        anywhere; near misses only within the first few words, where people
+        address Ada. A one-word phrase only accepts its listed sound-alikes
+        ("aida"), while longer phrases also accept a small edit ("hey data")
+        since the other words carry the context. A phrase word is never
+        matched across two heard words ("add a"), except exactly ("a da").
+        """
+        lowered = text.lower()
+        words = [(m.group(), m.start(), m.end()) for m in WORD.finditer(lowered)]
+        if not words:
+            return None
+
+        best = None
+        for wake_word in self.wake_words:
+            expected = wake_word.split()
+            target = "".join(expected)
+            size = len(expected)
+            # Also try one word more/less to catch "a da" or "heyada" splits, but only exactly
+            for span in (size, size - 1, size + 1):
+                if span < 1:
+                    continue
+                for i in range(len(words) - span + 1):
+                    heard = [word for word, _, _ in words[i:i + span]]
+                    if "".join(heard) == target:
+                        score = 1.0
+                    elif i >= self.fuzzy_window or span != size:
+                        continue
+                    else:
+                        score = min(word_score(h, e, size > 1, self.sound_alikes) for h, e in zip(heard, expected))
+                    if score >= self.threshold and (best is None or score > best[2]):
+                        end = words[i + span - 1][2]
+                        command = lowered[end:].lstrip(" ,.!?;:-").strip()
+                        best = (wake_word, command, score)
+                    if best and best[2] == 1.0:
+                        return best
+        return best
+
+    def update(self, partial_text):
+        """Feed a partial transcript; returns True once the gate has fired for this utterance"""
+        if not self.fired.is_set() and partial_text and self.find(partial_text):
+            self.fired.set()
+        return self.fired.is_set()
+
+    def reset(self):
+        """Call when a new utterance starts"""
+        self.fired.clear()
+
+    def consume(self):
+        """Decide whether the finished utterance deserves a full transcription, and reset"""
+        passed = self.fired.is_set()
+        with self.lock:
+            if passed:
+                self.passed += 1
+            else:
+                self.skipped += 1
+        self.reset()
+        return passed
+
+    def summary(self):
+        with self.lock:
+            total = self.passed + self.skipped
+            return (f"{self.passed}/{total} utterances passed the wake-word gate, "
+                    f"{self.skipped} full transcriptions skipped")